@@ -0,0 +1,62 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+
+# get_connectionが接続数に関係なく一定回数のクエリで済むことを確かめる
+# 使い方: python benchmarks/bench_get_connection.py [--sizes 100 1000 10000]
+
+def build(connection_num):
+    model.init_table()
+    table_num = max(2, connection_num // 5)
+    model.insert_tables([(f't{i}', ['id', 'ref']) for i in range(1, table_num+1)])
+    with model.db.transaction() as cur:
+        sql = """INSERT INTO table_connection (start_table_no, end_table_no, start_column_no, end_column_no) VALUES (?, ?, ?, ?)"""
+        cur.executemany(sql, [(random.randint(1, table_num), random.randint(1, table_num), 0, 1) for _ in range(connection_num)])
+    return table_num
+
+def count_queries(func):
+    # 実行されたSQL文を数える
+    statements = []
+    conn = model.db.connect()
+    conn.set_trace_callback(statements.append)
+    start_time = time.perf_counter()
+    try:
+        func()
+    finally:
+        conn.set_trace_callback(None)
+    return len([sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]), time.perf_counter() - start_time
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f'{"接続数":>8}  {"呼び出し":<28}{"初回クエリ":>10}{"2回目クエリ":>10}{"2回目(ms)":>10}')
+    for connection_num in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            model.db.path = os.path.join(directory, 'table.db')
+            model.catalog.invalidate()
+            table_num = build(connection_num)
+            calls = {
+                'get_connection()': lambda: model.get_connection(),
+                'get_connection(start)': lambda: model.get_connection('t1'),
+                'get_connection(start, end)': lambda: model.get_connection('t1', f't{table_num}'),
+            }
+            for name, func in calls.items():
+                # 初回はカタログの読み込みを含む
+                model.catalog.invalidate()
+                cold, _ = count_queries(func)
+                warm, elapsed = count_queries(func)
+                print(f'{connection_num:>8}  {name:<28}{cold:>10}{warm:>10}{elapsed*1000:>10.2f}')
+            model.db.close()
+
+if __name__ == '__main__':
+    main()
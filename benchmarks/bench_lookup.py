@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+
+# 索引あり・なしで、テーブル名・列名・接続の引き当てにかかる時間を比べる
+# 使い方: python benchmarks/bench_lookup.py [--tables 10000] [--columns 20] [--lookups 2000]
+
+# migrate_add_indexesで作る索引
+indexes = [
+    'idx_table_list_name',
+    'idx_table_columns_no',
+    'idx_table_columns_name',
+    'idx_table_connection_start',
+    'idx_table_connection_end',
+]
+
+lookups = {
+    'table_name -> table_no': ('SELECT table_no FROM table_list WHERE table_name=?', lambda t, c: [f't{t}']),
+    'table_no, column -> column_no': ('SELECT column_no FROM table_columns WHERE table_no=? and column=?', lambda t, c: [t, f'c{c}']),
+    'table_no, column_no -> column': ('SELECT column FROM table_columns WHERE table_no=? and column_no=?', lambda t, c: [t, c]),
+    'start_table_no -> connections': ('SELECT * FROM table_connection WHERE start_table_no=?', lambda t, c: [t]),
+    'end_table_no -> connections': ('SELECT * FROM table_connection WHERE end_table_no=?', lambda t, c: [t]),
+}
+
+def build(table_num, column_num):
+    model.init_table()
+    model.insert_tables([(f't{i}', [f'c{j}' for j in range(column_num)]) for i in range(1, table_num+1)])
+    with model.db.transaction() as cur:
+        sql = """INSERT INTO table_connection (start_table_no, end_table_no, start_column_no, end_column_no) VALUES (?, ?, ?, ?)"""
+        cur.executemany(sql, [(i, random.randint(1, table_num), 0, 0) for i in range(1, table_num+1)])
+
+def measure(table_num, column_num, lookup_num):
+    conn = model.db.connect()
+    targets = [(random.randint(1, table_num), random.randrange(column_num)) for _ in range(lookup_num)]
+    results = {}
+    for name, (sql, params) in lookups.items():
+        start_time = time.perf_counter()
+        for t, c in targets:
+            conn.execute(sql, params(t, c)).fetchall()
+        results[name] = (time.perf_counter() - start_time) / lookup_num * 1e6
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tables', type=int, default=10000)
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        model.db.path = os.path.join(directory, 'table.db')
+        build(args.tables, args.columns)
+        print(f'{args.tables}テーブル / {args.tables * args.columns}列 / {args.lookups}回の平均（マイクロ秒）')
+
+        after = measure(args.tables, args.columns, args.lookups)
+        with model.db.transaction() as cur:
+            for name in indexes:
+                cur.execute(f'DROP INDEX {name}')
+        # 索引なしでは全件走査になるので回数を減らす
+        before = measure(args.tables, args.columns, max(1, args.lookups // 20))
+
+        print(f'{"":32}{"索引なし":>12}{"索引あり":>12}')
+        for name in lookups:
+            print(f'{name:32}{before[name]:12.1f}{after[name]:12.1f}')
+        model.db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+
+# テーブルの追加・削除と一覧の描き直しを繰り返し、メモリと登録数が増え続けないことを確かめる
+# 画面がない場合（Linuxの端末やCIなど）は図形を数えるだけのキャンバスで同じ描き直しを行う
+# 使い方: python benchmarks/bench_redraw_memory.py [--tables 200] [--redraws 1000] [--headless]
+
+class StubCanvas():
+    # 作った図形を数えるだけのキャンバス
+    def __init__(self, window, width, height):
+        self.window = window
+        self.width = width
+        self.height = height
+        self.items = {}
+        self.next_id = 0
+        self.scrollregion = (0, 0, width, height)
+
+    def create(self, *coords, tags=None, **options):
+        self.next_id += 1
+        self.items[self.next_id] = tags
+        return self.next_id
+
+    create_line = create
+    create_rectangle = create
+    create_text = create
+    create_oval = create
+    create_window = create
+
+    def delete(self, *ids):
+        for id in ids:
+            if isinstance(id, str):
+                for item in [item for item, tags in self.items.items() if tags == id]:
+                    del self.items[item]
+            else:
+                self.items.pop(id, None)
+
+    def coords(self, *args):
+        pass
+
+    def itemconfigure(self, *args, **kwargs):
+        pass
+
+    def configure(self, scrollregion=None, **kwargs):
+        if scrollregion is not None:
+            self.scrollregion = scrollregion
+
+    def cget(self, key):
+        if key == 'scrollregion':
+            return ' '.join(str(v) for v in self.scrollregion)
+        return str(self.width if key == 'width' else self.height)
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def after_idle(self, func):
+        return self.window.after_idle(func)
+
+    def after_cancel(self, id):
+        self.window.after_cancel(id)
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def xview_moveto(self, fraction):
+        pass
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def find_all(self):
+        return tuple(self.items)
+
+class StubTreeview():
+    def __init__(self):
+        self.rows = {}
+
+    def exists(self, iid):
+        return str(iid) in self.rows
+
+    def insert(self, parent, index, iid, values):
+        self.rows[str(iid)] = values
+
+    def item(self, iid, values):
+        self.rows[str(iid)] = values
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.rows[str(iid)]
+
+    def get_children(self):
+        return tuple(self.rows)
+
+    def focus(self):
+        return ''
+
+def create_headless_window():
+    import gui
+
+    # フォントを使わずに文字数から大きさを決める
+    gui.measure_text = lambda text, size: (len(text) * size // 2 + 10, size + 4)
+
+    class HeadlessWindow(gui.MainWindow):
+        # Tkを起動せずに、MainWindowの描き直しの処理だけを動かす
+        def __init__(self):
+            self.table_list = {}
+            self.connect_list = {}
+            self.table_list_values = {}
+            self.connection_rows = []
+            self.connection_row_slots = {}
+            self.connection_row_pool = []
+            self.connection_list_after = None
+            self.layout_changes = {}
+            self.layout_after = None
+            self.highlighted = None
+            self.path_highlights = []
+            self.idle = {}
+            self.next_after = 0
+            self.canvas = StubCanvas(self, gui.canvas_width, gui.canvas_height)
+            self.canvas_connect_list = StubCanvas(self, 400, 400)
+            self.list_views = {'テーブル一覧': StubTreeview(), 'カラム一覧': StubTreeview()}
+            self.draw()
+            model.add_change_listener(self.on_change)
+
+        def after_idle(self, func):
+            self.next_after += 1
+            self.idle[self.next_after] = func
+            return self.next_after
+
+        def after(self, ms, func, *args):
+            return self.after_idle(lambda: func(*args))
+
+        def after_cancel(self, id):
+            self.idle.pop(id, None)
+
+        def update(self):
+            while len(self.idle) > 0:
+                self.idle.pop(next(iter(self.idle)))()
+
+        def draw_visible_connection_rows(self):
+            # 一覧の行はTkのウィジェットを含むので作らない
+            pass
+
+        def close(self):
+            self.update()
+            model.db.change_listeners.remove(self.on_change)
+
+    return HeadlessWindow()
+
+def create_window(headless):
+    if not headless:
+        import tkinter
+        from gui import MainWindow
+        try:
+            return MainWindow(), False
+        except tkinter.TclError as e:
+            print(f'画面が使えないため、キャンバスなしで実行します（{e}）')
+    return create_headless_window(), True
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tables', type=int, default=200)
+    parser.add_argument('--redraws', type=int, default=1000)
+    parser.add_argument('--every', type=int, default=100)
+    parser.add_argument('--headless', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        model.db.path = os.path.join(directory, 'table.db')
+        model.init_table()
+        model.insert_tables([(f't{i}', ['id', 'ref']) for i in range(args.tables)])
+        for i in range(1, args.tables):
+            model.insert_connection(f't{i}', f't{i-1}', [['ref', 'id']], [None])
+
+        from gui import get_scene
+        main_window, headless = create_window(args.headless)
+        main_window.update()
+        scene = get_scene(main_window.canvas)
+
+        tracemalloc.start()
+        print(f'{"回数":>6}{"メモリ(KB)":>12}{"エンティティ":>12}{"線":>8}{"キャンバス図形":>14}')
+        for i in range(1, args.redraws+1):
+            # 変更通知による描き直しと、一覧全体の描き直しを1回ずつ行う
+            model.insert_table('tmp', ['id'])
+            model.insert_connection('tmp', 't0', [['id', 'id']], [None])
+            main_window.update()
+            model.delete_table('tmp')
+            main_window.draw_connection_list()
+            main_window.update()
+            if i % args.every == 0:
+                current, _ = tracemalloc.get_traced_memory()
+                print(f'{i:>6}{current/1024:>12.0f}{len(scene.entities):>12}{len(main_window.connect_list):>8}{len(main_window.canvas.find_all()):>14}')
+        tracemalloc.stop()
+        main_window.close()
+        model.db.close()
+
+if __name__ == '__main__':
+    main()
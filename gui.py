@@ -0,0 +1,1591 @@
+import tkinter as tk
+from tkinter import ttk
+import tkinter.filedialog
+import tkinter.font
+import functools
+import os
+import random
+import threading
+import concurrent.futures
+import math
+import queue
+
+from model import db, add_change_listener, get_catalog_generation, TableAdded, TableRenamed, TableDeleted, ColumnsChanged, ConnectionAdded, ConnectionRemoved, ConnectionChanged
+from model import get_tables, get_table_no, get_table_name, get_table_columns, get_table_column_details, get_connection, get_connection_keys, get_connection_count, get_connection_counts, get_layouts
+from model import insert_table, update_table, update_columns, delete_table, save_layouts, set_table_source, import_sqlite_files
+from model import find_join_paths, search_names, read_csv_header, profile_csv_file, update_column_profiles, force_layout
+
+scenes = {}
+
+# ドラッグ中の配置を書き込むまでの待ち時間（ミリ秒）
+layout_save_delay = 500
+# 別プロセス（CLIなど）の書き込みを確かめる間隔（ミリ秒）
+external_check_interval = 1000
+
+# 表示範囲の外にどれだけ余分に図形を作っておくか（画面上のピクセル）
+view_margin = 200
+min_scale = 0.05
+max_scale = 4.0
+
+# 縮小表示の段階：これより小さいと文字を省いて塗りつぶしの四角だけにし、さらに小さいとまとめて塊で描く
+lod_text_scale = 0.4
+lod_cluster_scale = 0.12
+# 塊にまとめるときの1区画の大きさ（画面上のピクセル）
+cluster_size = 32
+
+window_width = 1600
+window_height = 1000
+canvas_width = 1200
+canvas_height = 800
+
+class Point():
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+    
+    def set(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __str__(self):
+        return f'{self.x},{self.y}'
+
+    def __add__(self, other):
+        return Point(self.x + other.x, self.y + other.y)
+    
+    def __sub__(self, other):
+        return Point(self.x - other.x, self.y - other.y)
+
+fonts = {}
+
+def get_font(size):
+    if size not in fonts:
+        fonts[size] = tkinter.font.Font(font=('', size))
+    return fonts[size]
+
+@functools.lru_cache(maxsize=8192)
+def measure_text(text, size):
+    # キャンバスに描かずにフォントからテキストの大きさを求める
+    font = get_font(size)
+    return font.measure(text), font.metrics('linespace')
+
+def measure_texts(texts, size):
+    return [measure_text(text, size) for text in texts]
+
+class SpatialGrid():
+    __slots__ = ('cell_size', 'cells', 'entity_cells')
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entity_cells = {}
+
+    def get_cells(self, x1, y1, x2, y2):
+        c = self.cell_size
+        return [(cx, cy) for cx in range(int(x1//c), int(x2//c)+1) for cy in range(int(y1//c), int(y2//c)+1)]
+
+    def update(self, entity):
+        cells = self.get_cells(entity.point.x, entity.point.y, entity.point.x+entity.width, entity.point.y+entity.height)
+        old_cells = self.entity_cells.get(entity)
+        # ドラッグ中はほとんど同じセルに留まるので変化がなければ何もしない
+        if old_cells == cells:
+            return
+        if old_cells is not None:
+            for cell in old_cells:
+                self.cells[cell].discard(entity)
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(entity)
+        self.entity_cells[entity] = cells
+
+    def remove(self, entity):
+        for cell in self.entity_cells.pop(entity, []):
+            self.cells[cell].discard(entity)
+            if len(self.cells[cell]) == 0:
+                del self.cells[cell]
+
+    def query(self, x1, y1, x2, y2):
+        entities = set()
+        c = self.cell_size
+        cx1, cy1, cx2, cy2 = int(x1//c), int(y1//c), int(x2//c), int(y2//c)
+        # 縮小表示で範囲が広いときは、使われているセルだけを調べる
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            for (cx, cy), cell_entities in self.cells.items():
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2:
+                    entities.update(cell_entities)
+            return entities
+        for cell in self.get_cells(x1, y1, x2, y2):
+            entities.update(self.cells.get(cell, ()))
+        return entities
+
+class Scene():
+    __slots__ = ('canvas', 'entities', 'connections', 'visible', 'visible_connections', 'items', 'drag_entity', 'grid', 'scale', 'tier', 'bounds_dirty', 'view_after')
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.entities = set()
+        self.connections = set()
+        self.visible = set()
+        self.visible_connections = set()
+        # 図形ID→エンティティ。マウス操作はキャンバス全体で受けてここから対象を引く
+        self.items = {}
+        self.drag_entity = None
+        self.grid = SpatialGrid()
+        self.scale = 1.0
+        self.tier = get_tier(self.scale)
+        self.bounds_dirty = True
+        self.view_after = None
+
+        self.canvas.bind('<ButtonPress-1>', self.button_press, add='+')
+        self.canvas.bind('<B1-Motion>', self.move, add='+')
+        self.canvas.bind('<ButtonRelease-1>', self.button_release, add='+')
+
+    def add(self, entity):
+        self.entities.add(entity)
+        self.update(entity)
+
+    def update(self, entity):
+        self.grid.update(entity)
+        self.bounds_dirty = True
+        self.schedule_view()
+
+    def remove(self, entity):
+        self.entities.discard(entity)
+        self.visible.discard(entity)
+        self.grid.remove(entity)
+        self.bounds_dirty = True
+        if self.drag_entity is entity:
+            self.drag_entity = None
+
+    def find_entity(self, x, y):
+        x, y = self.canvas.canvasx(x), self.canvas.canvasy(y)
+        # 上に描かれている図形から順に調べる
+        for id in reversed(self.canvas.find_overlapping(x, y, x, y)):
+            entity = self.items.get(id)
+            if entity is not None:
+                return entity
+        return None
+
+    def button_press(self, event):
+        self.drag_entity = self.find_entity(event.x, event.y)
+        if self.drag_entity is not None:
+            self.drag_entity.button_press(event)
+
+    def move(self, event):
+        if self.drag_entity is not None:
+            self.drag_entity.move(event)
+
+    def button_release(self, event):
+        entity = self.drag_entity
+        self.drag_entity = None
+        if entity is not None:
+            entity.button_release(event)
+
+    def add_connection(self, connection):
+        self.connections.add(connection)
+        self.schedule_view()
+
+    def remove_connection(self, connection):
+        self.connections.discard(connection)
+        self.visible_connections.discard(connection)
+
+    def to_world(self, x, y):
+        # 画面上の位置をワールド座標に直す
+        return Point(self.canvas.canvasx(x) / self.scale, self.canvas.canvasy(y) / self.scale)
+
+    def get_size(self):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        # 表示前は大きさが取れないので設定値を使う
+        if width <= 1 or height <= 1:
+            width = int(self.canvas.cget('width'))
+            height = int(self.canvas.cget('height'))
+        return width, height
+
+    def get_view(self, margin=0):
+        width, height = self.get_size()
+        top_left = self.to_world(-margin, -margin)
+        bottom_right = self.to_world(width + margin, height + margin)
+        return top_left.x, top_left.y, bottom_right.x, bottom_right.y
+
+    def schedule_view(self):
+        if self.view_after is None:
+            self.view_after = self.canvas.after_idle(self.update_view)
+
+    def update_view(self):
+        # 表示範囲（余白込み）に入ったものだけ図形を作り、外れたものは消す
+        self.view_after = None
+        if self.bounds_dirty:
+            self.update_scrollregion()
+        x1, y1, x2, y2 = self.get_view(view_margin)
+        entities = self.grid.query(x1, y1, x2, y2)
+        connections = set()
+        for connection in self.connections:
+            cx1, cy1, cx2, cy2 = connection.get_bounds()
+            if cx1 <= x2 and cx2 >= x1 and cy1 <= y2 and cy2 >= y1:
+                connections.add(connection)
+        if self.tier == 2:
+            self.draw_clusters(entities, connections)
+            return
+        for entity in self.visible - entities:
+            entity.hide()
+        for entity in entities - self.visible:
+            entity.draw_entity()
+        self.visible = entities
+        for connection in self.visible_connections - connections:
+            connection.hide()
+        for connection in connections - self.visible_connections:
+            connection.draw()
+        self.visible_connections = connections
+
+    def draw_clusters(self, entities, connections):
+        # 近くのエンティティを画面上の区画ごとに1つの塊にまとめ、線も塊の組ごとに1本にする
+        self.canvas.delete('cluster')
+        size = cluster_size / self.scale
+        clusters = {}
+
+        # 塊ごとに [見えている数, 塊に入るエンティティ数, x合計, y合計]。線の端だけの見えないエンティティも位置には数える
+        members = {}
+
+        def add(entity, visible):
+            # 線の端として何度出てきても、位置を足すのは1度だけにする
+            if entity in members:
+                return members[entity]
+            center = entity.get_center()
+            key = (int(center.x // size), int(center.y // size))
+            members[entity] = key
+            if key not in clusters:
+                clusters[key] = [0, 0, 0, 0]
+            cluster = clusters[key]
+            if visible:
+                cluster[0] += 1
+            cluster[1] += 1
+            cluster[2] += center.x
+            cluster[3] += center.y
+            return key
+
+        pairs = {}
+        for entity in entities:
+            add(entity, True)
+        for connection in connections:
+            key = tuple(sorted((add(connection.start_e, False), add(connection.end_e, False))))
+            if key[0] != key[1]:
+                pairs[key] = pairs.get(key, False) or connection.color == 'red'
+        centers = {}
+        for key, (_, n, x, y) in clusters.items():
+            centers[key] = (x / n * self.scale, y / n * self.scale)
+        for (key1, key2), is_red in pairs.items():
+            self.canvas.create_line(*centers[key1], *centers[key2], fill='red' if is_red else 'gray60', tags='cluster')
+        for key, (count, _, _, _) in clusters.items():
+            if count == 0:
+                continue
+            x, y = centers[key]
+            r = min(cluster_size / 2, 2 + math.sqrt(count) * 2)
+            self.canvas.create_oval(x - r, y - r, x + r, y + r, fill='gray40', outline='', tags='cluster')
+
+    def clear(self):
+        # 表示の段階が変わるときは図形をタグで1回にまとめて消す
+        self.canvas.delete('entity', 'connection', 'cluster')
+        self.items = {}
+        for entity in self.visible:
+            entity.forget()
+        for connection in self.visible_connections:
+            connection.id = None
+        self.visible = set()
+        self.visible_connections = set()
+
+    def update_scrollregion(self, include_view=True):
+        # 全エンティティを囲む範囲をスクロールできるようにする
+        self.bounds_dirty = False
+        s = self.scale
+        x1 = y1 = math.inf
+        x2 = y2 = -math.inf
+        for entity in self.entities:
+            x1 = min(x1, entity.point.x)
+            y1 = min(y1, entity.point.y)
+            x2 = max(x2, entity.point.x + entity.width)
+            y2 = max(y2, entity.point.y + entity.height)
+        if len(self.entities) == 0:
+            x1, y1, x2, y2 = 0, 0, 0, 0
+        x1, y1, x2, y2 = x1*s - view_margin, y1*s - view_margin, x2*s + view_margin, y2*s + view_margin
+        if include_view:
+            # 今見えている位置が範囲外になって表示が飛ばないようにする
+            width, height = self.get_size()
+            left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+            x1, y1, x2, y2 = min(x1, left), min(y1, top), max(x2, left + width), max(y2, top + height)
+        self.canvas.configure(scrollregion=(x1, y1, x2, y2))
+
+    def set_scale(self, scale, x, y):
+        # 画面上の(x, y)にある点を動かさずに拡大・縮小する
+        scale = min(max(scale, min_scale), max_scale)
+        if scale == self.scale:
+            return
+        point = self.to_world(x, y)
+        self.scale = scale
+        tier = get_tier(scale)
+        if tier != self.tier:
+            self.tier = tier
+            self.clear()
+        else:
+            for entity in self.visible:
+                entity.rescale()
+            for connection in self.visible_connections:
+                connection.rescale()
+        self.update_scrollregion(include_view=False)
+        self.scroll_view(point.x*scale - x, point.y*scale - y)
+        self.bounds_dirty = True
+
+    def scroll_view(self, left, top):
+        # キャンバス座標の(left, top)が左上に来るようにスクロールする
+        x1, y1, x2, y2 = [float(v) for v in self.canvas.cget('scrollregion').split()]
+        self.canvas.xview_moveto((left - x1) / (x2 - x1))
+        self.canvas.yview_moveto((top - y1) / (y2 - y1))
+        self.schedule_view()
+
+    def scroll_to(self, x, y):
+        # ワールド座標の(x, y)が画面の中央に来るようにする
+        if self.bounds_dirty:
+            self.update_scrollregion()
+        width, height = self.get_size()
+        self.scroll_view(x*self.scale - width/2, y*self.scale - height/2)
+
+def get_tier(scale):
+    if scale >= lod_text_scale:
+        return 0
+    if scale >= lod_cluster_scale:
+        return 1
+    return 2
+
+def get_scene(canvas):
+    if canvas not in scenes:
+        scenes[canvas] = Scene(canvas)
+    return scenes[canvas]
+
+class Entity():
+    __slots__ = ('main_window', 'canvas', 'scene', 'point', 'text', 'size', 'width', 'height', 'is_move', 'start_point', 'drag_point', 'drag_after', 'highlight', 'id', 'connections')
+
+    def __init__(self, main_window, canvas, point, text, size=20, is_move=True):
+        self.main_window = main_window
+        self.canvas = canvas
+        self.scene = get_scene(canvas)
+        self.point = Point(point.x+1, point.y+1)
+        self.text = text
+        self.size = size
+        self.is_move = is_move
+        self.start_point = Point(None, None)
+        self.drag_point = None
+        self.drag_after = None
+        self.highlight = False
+        self.id = {'rectangle':None, 'text':None}
+        self.connections = []
+
+        self.set_size()
+
+        # 図形は表示範囲に入ったときにSceneが作る
+        self.scene.add(self)
+
+    def destroy(self):
+        # キャンバスの図形・バインド・登録をすべて外す
+        for connection in list(self.connections):
+            connection.destroy()
+        if self.drag_after is not None:
+            self.canvas.after_cancel(self.drag_after)
+            self.drag_after = None
+        self.hide()
+        self.scene.remove(self)
+
+    def draw_entity(self):
+        if self.id['rectangle'] is not None:
+            return
+        s = self.scene.scale
+        x, y = self.point.x*s, self.point.y*s
+        if self.scene.tier == 0:
+            self.id['rectangle'] = self.canvas.create_rectangle(x, y, x+self.width*s, y+self.height*s, fill='white', outline=self.get_outline(), width=3 if self.highlight else 1, tags='entity')
+            self.id['text'] = self.canvas.create_text(x+(self.width*s/2), y+(self.height*s/2), text=self.text, font=('', self.get_font_size()), tags='entity')
+        else:
+            # 縮小時は読めない文字を省いて塗りつぶしの四角だけにする
+            self.id['rectangle'] = self.canvas.create_rectangle(x, y, x+self.width*s, y+self.height*s, fill=self.get_outline() if self.highlight else 'gray70', outline='', tags='entity')
+
+        if self.is_move:
+            for id in self.id.values():
+                if id is not None:
+                    self.scene.items[id] = self
+
+    def hide(self):
+        for key, id in self.id.items():
+            if id is not None:
+                self.canvas.delete(id)
+                self.scene.items.pop(id, None)
+                self.id[key] = None
+
+    def forget(self):
+        # 図形はまとめて消されたので参照だけ外す
+        self.id['rectangle'] = None
+        self.id['text'] = None
+
+    def get_outline(self):
+        return 'orange' if self.highlight else 'black'
+
+    def set_highlight(self, highlight):
+        self.highlight = highlight
+        if self.id['rectangle'] is None:
+            return
+        if self.id['text'] is not None:
+            self.canvas.itemconfigure(self.id['rectangle'], outline=self.get_outline(), width=3 if highlight else 1)
+        else:
+            self.canvas.itemconfigure(self.id['rectangle'], fill=self.get_outline() if highlight else 'gray70')
+
+    def get_font_size(self):
+        return max(1, round(self.size * self.scene.scale))
+
+    def place(self):
+        if self.id['rectangle'] is None:
+            return
+        s = self.scene.scale
+        x, y = self.point.x*s, self.point.y*s
+        self.canvas.coords(self.id['rectangle'], x, y, x+self.width*s, y+self.height*s)
+        if self.id['text'] is not None:
+            self.canvas.coords(self.id['text'], x+(self.width*s/2), y+(self.height*s/2))
+
+    def rescale(self):
+        self.place()
+        if self.id['text'] is not None:
+            self.canvas.itemconfigure(self.id['text'], font=('', self.get_font_size()))
+    
+    def set_size(self):
+        # テキストの大きさを取得
+        self.width, self.height = measure_text(self.text, self.size)
+
+    def update_text(self, new_text):
+        self.text = new_text
+        self.set_size()
+        self.place()
+        if self.id['text'] is not None:
+            self.canvas.itemconfigure(self.id['text'], text=new_text)
+        self.scene.update(self)
+
+    def move_entity(self, world_point):
+        sub_point = self.start_point - world_point
+        # 近くのセルにいるエンティティだけ重なりを調べる
+        center_x = self.point.x + self.width//2
+        center_y = self.point.y + self.height//2
+        for e in self.scene.grid.query(self.point.x, self.point.y, self.point.x+self.width, self.point.y+self.height):
+            if e == self:
+                continue
+            other_center_x = e.point.x + e.width//2
+            other_center_y = e.point.y + e.height//2
+            if abs(center_x - other_center_x) <= (self.width + e.width) / 2 and abs(center_y - other_center_y) <= (self.height + e.height) / 2:
+                sub_point.set(1 if sub_point.x > 0 else -1, 0 if sub_point.y > 0 else -1)
+        # キャンバスから座標を読み直さず、保持している位置から計算する
+        self.point.set(self.point.x - sub_point.x, self.point.y - sub_point.y)
+        self.place()
+
+    def move_to(self, x, y):
+        self.point.set(x, y)
+        self.place()
+        self.scene.update(self)
+        for connection in self.connections:
+            connection.move(self)
+    
+    def button_press(self, event):
+        self.start_point = self.scene.to_world(event.x, event.y)
+        self.main_window.list_views['テーブル一覧'].selection_set(get_table_no(self.text))
+        self.main_window.list_views['テーブル一覧'].focus(get_table_no(self.text))
+        #self.main_window.draw()
+    
+    def move(self, event):
+        if self.start_point.x is None:
+            return
+        if event.state & 256:
+            # 位置だけ記録し、描画はアイドル時に1フレーム分まとめて行う
+            self.drag_point = self.scene.to_world(event.x, event.y)
+            if self.drag_after is None:
+                self.drag_after = self.canvas.after_idle(self.flush_move)
+
+    def flush_move(self):
+        self.drag_after = None
+        if self.drag_point is None or self.start_point.x is None:
+            return
+        world_point = self.drag_point
+        self.drag_point = None
+        self.move_entity(world_point)
+        self.start_point.set(world_point.x, world_point.y)
+        self.scene.grid.update(self)
+        for connection in self.connections:
+            connection.move(self)
+        self.main_window.entity_moved(self)
+    
+    def button_release(self, event):
+        if self.drag_after is not None:
+            self.canvas.after_cancel(self.drag_after)
+            self.flush_move()
+        if self.start_point.x is not None:
+            # ドラッグが終わってから表示範囲とスクロール範囲を更新する
+            self.scene.update(self)
+        self.start_point.set(None, None)
+    
+    def get_center(self):
+        return self.point + Point(self.width//2, self.height//2)
+    
+    def add_listener(self, connection):
+        self.connections.append(connection)
+
+class Connection():
+    __slots__ = ('canvas', 'scene', 'start_e', 'end_e', 'sub_point', 'width', 'color', 'highlight', 'id')
+
+    def __init__(self, canvas, start_entity, end_entity, width=5, color='black', sub_point=0):
+        self.canvas = canvas
+        self.scene = get_scene(canvas)
+        self.start_e = start_entity
+        self.end_e = end_entity
+        self.start_e.add_listener(self)
+        self.end_e.add_listener(self)
+        self.sub_point = sub_point
+        self.width = width
+        self.color = color
+        self.highlight = False
+        self.id = None
+
+        self.scene.add_connection(self)
+    
+    def get_intersection(self, entity):
+        point = entity.get_center()
+        point = point - Point(self.sub_point, self.sub_point)
+        h = entity.height // 2
+        w = entity.width // 2
+        dx = self.end_e.point.x - self.start_e.point.x
+        dy = self.end_e.point.y - self.start_e.point.y
+        if entity == self.end_e:
+            dx, dy = -dx, -dy
+        if dx != 0 and abs(dy / dx) < (h / w):
+            x_pos = point.x + w if dx > 0 else point.x - w
+            y_pos = point.y + dy * w / abs(dx)
+        else:
+            x_pos = point.x + dx * h / abs(dy)
+            y_pos = point.y + h if dy > 0 else point.y - h
+        return x_pos, y_pos
+
+    def get_bounds(self):
+        start = self.start_e.get_center()
+        end = self.end_e.get_center()
+        return min(start.x, end.x), min(start.y, end.y), max(start.x, end.x), max(start.y, end.y)
+
+    def get_coords(self):
+        s = self.scene.scale
+        x1, y1 = self.get_intersection(self.start_e)
+        x2, y2 = self.get_intersection(self.end_e)
+        return x1*s, y1*s, x2*s, y2*s
+
+    def draw(self):
+        if self.id is not None:
+            return
+        self.id = self.canvas.create_line(*self.get_coords(), fill=self.get_color(), width=self.get_width(), tags='connection')
+
+    def get_color(self):
+        return 'orange' if self.highlight else self.color
+
+    def get_width(self):
+        if self.scene.tier > 0:
+            return 3 if self.highlight else 1
+        return max(1, self.width*self.scene.scale)
+    
+    def move(self, entity):
+        # 両端を計算し直して1回で座標を設定する
+        if self.id is None:
+            return
+        self.canvas.coords(self.id, *self.get_coords())
+
+    def rescale(self):
+        if self.id is None:
+            return
+        self.canvas.coords(self.id, *self.get_coords())
+        self.canvas.itemconfigure(self.id, width=self.get_width())
+
+    def set_color(self, color):
+        self.color = color
+        if self.id is not None:
+            self.canvas.itemconfigure(self.id, fill=self.get_color())
+
+    def set_highlight(self, highlight):
+        self.highlight = highlight
+        if self.id is not None:
+            self.canvas.itemconfigure(self.id, fill=self.get_color(), width=self.get_width())
+
+    def hide(self):
+        if self.id is None:
+            return
+        self.canvas.delete(self.id)
+        self.id = None
+
+    def destroy(self):
+        self.hide()
+        self.scene.remove_connection(self)
+        for entity in (self.start_e, self.end_e):
+            if self in entity.connections:
+                entity.connections.remove(self)
+
+class ConnectionListRow():
+    def __init__(self, canvas, variable):
+        self.canvas = canvas
+        self.row = None
+        self.y = None
+
+        # 線を先に作ってラベルの下に描かれるようにする
+        self.line = canvas.create_line(0, 0, 0, 0, state='hidden')
+        self.labels = []
+        for _ in range(3):
+            rectangle = canvas.create_rectangle(0, 0, 0, 0, fill='white', state='hidden')
+            text = canvas.create_text(0, 0, font=('', 15), state='hidden')
+            self.labels.append((rectangle, text))
+        self.radiobutton = tk.Radiobutton(canvas, text='', background='white', variable=variable)
+        self.window = canvas.create_window(0, 0, window=self.radiobutton, anchor='nw', state='hidden')
+
+    def show(self, row, y):
+        # 前回と同じ内容・位置なら描き直さない
+        if row == self.row and y == self.y:
+            return
+        self.row = row
+        self.y = y
+        list_width = self.canvas.winfo_width()
+        check_width = self.radiobutton.winfo_reqwidth()
+
+        if row[0] == 'pair':
+            _, con_key, st, es, cardinality, color = row
+            st_x = self.show_label(0, st, check_width+1, y+1)
+            es_x = list_width - measure_text(es, 15)[0] - 5 + 1
+            self.show_label(1, es, es_x, y+1)
+            cardinality_width = measure_text(cardinality, 15)[0]
+            self.show_label(2, cardinality, (list_width-check_width)//2-cardinality_width//2+check_width+1, y+1)
+            self.show_line(st_x, es_x, y+1, 5, color)
+            self.radiobutton.configure(value=con_key)
+            self.canvas.coords(self.window, 0, y+1)
+            self.canvas.itemconfigure(self.window, state='normal')
+        else:
+            _, _, start_column, end_column, color = row
+            dash_width = measure_text('-----', 15)[0]
+            con_x = (list_width-check_width)//2-dash_width//2+check_width+1
+            self.show_label(0, start_column, con_x-measure_text(start_column, 15)[0], y+1)
+            self.show_label(1, end_column, con_x+dash_width, y+1)
+            self.hide_label(2)
+            self.show_line(con_x, con_x+dash_width, y+1, 2, color)
+            self.canvas.itemconfigure(self.window, state='hidden')
+
+    def show_label(self, i, text, x, y):
+        width, height = measure_text(text, 15)
+        rectangle, text_id = self.labels[i]
+        self.canvas.coords(rectangle, x, y, x+width, y+height)
+        self.canvas.coords(text_id, x+(width//2), y+(height//2))
+        self.canvas.itemconfigure(text_id, text=text, state='normal')
+        self.canvas.itemconfigure(rectangle, state='normal')
+        return x + width
+
+    def hide_label(self, i):
+        for id in self.labels[i]:
+            self.canvas.itemconfigure(id, state='hidden')
+
+    def show_line(self, x1, x2, y, width, color):
+        height = measure_text('-----', 15)[1]
+        self.canvas.coords(self.line, x1, y+(height//2), x2, y+(height//2))
+        self.canvas.itemconfigure(self.line, width=width, fill=color, state='normal')
+
+    def hide(self):
+        self.row = None
+        self.y = None
+        self.canvas.itemconfigure(self.line, state='hidden')
+        for i in range(len(self.labels)):
+            self.hide_label(i)
+        self.canvas.itemconfigure(self.window, state='hidden')
+
+class RegistWindow(tk.Toplevel):
+    def __init__(self, main_window):
+        super().__init__()
+        
+        # 定数
+        self.window_width = 300
+        self.window_height = 300
+        
+        # 引数をインスタンス変数
+        self.main_window = main_window
+        self.canvas = main_window.canvas
+        
+        # インスタンス変数
+        self.buttons = {}
+        self.column_entry_list = []
+        self.filename = None
+        
+        self.title('テーブル登録')
+        self.geometry(f'{self.window_width}x{self.window_height}')
+        
+        self.buttons['ファイル読み込み'] = tk.Button(self, text='ファイル読み込み', command=self.file_dialog)
+        self.buttons['列追加'] = tk.Button(self, text='列追加', command=self.add_entry)
+        self.buttons['登録'] = tk.Button(self, text='登録', command=self.regist_table)
+        self.buttons['キャンセル'] = tk.Button(self, text='キャンセル', command=self.destroy)
+        self.buttons['ファイル読み込み'].grid(row=1, column=0)
+        self.buttons['列追加'].grid(row=1, column=1)
+        self.buttons['登録'].grid(row=1, column=2)
+        self.buttons['キャンセル'].grid(row=1, column=3)
+        
+        label_table_name = tk.Label(self, text='テーブル名', anchor='center')
+        self.entry_table_name = tk.Entry(self, width=20)
+        label_table_name.grid(row=2, column=0, columnspan=1)
+        self.entry_table_name.grid(row=2, column=2, columnspan=3)
+        
+        for _ in range(0, 5):
+            self.add_entry()
+        
+    def file_dialog(self):
+        filename = tk.filedialog.askopenfilename(parent=self, filetypes=[("", ".csv")], initialdir=os.path.abspath(os.path.dirname(__file__)))
+        if len(filename) != 0:
+            columns = read_csv_header(filename)
+            self.filename = filename
+            table_name = os.path.splitext(os.path.basename(filename))[0]
+            #insert_table(table_name, columns)
+            #self.draw_table_list()
+            self.entry_table_name.insert(0, table_name)
+            for l, e in self.column_entry_list:
+                l.destroy()
+                e.destroy()
+            del self.column_entry_list[:]
+            
+            while len(self.column_entry_list) < len(columns):
+                self.add_entry()
+            for i in range(0, len(columns)):
+                self.column_entry_list[i][1].insert(0, columns[i])
+        
+        self.lift()
+
+    def add_entry(self):
+        label = tk.Label(self, text=f'列{len(self.column_entry_list)+1}', anchor='center')
+        entry = tk.Entry(self, width=20)
+        label.grid(row=len(self.column_entry_list)+3, column=0, columnspan=1)
+        entry.grid(row=len(self.column_entry_list)+3, column=2, columnspan=3)
+        self.column_entry_list.append([label, entry])
+
+    def regist_table(self):
+        table_name = self.entry_table_name.get()
+        
+        if table_name == '':
+            return
+
+        table_list = get_tables()
+        if table_name in table_list:
+            print('既にテーブルがあります。')
+            return
+
+        columns = []
+        for _, entry in self.column_entry_list:
+            if entry.get() != '':
+                if entry.get() in columns:
+                    print('列名がかぶっています。')
+                    return
+                columns.append(entry.get())
+        if len(columns) <= 0:
+            print('列が入力されていない')
+            return
+        insert_table(table_name, columns)
+        if self.filename is not None:
+            set_table_source(table_name, self.filename)
+            self.main_window.profile_table(table_name, self.filename)
+        
+        self.destroy()
+
+class EditWindow(tk.Toplevel):
+    def __init__(self, main_window, table_name):
+        super().__init__()
+        
+        # 定数
+        self.window_width = 300
+        self.window_height = 300
+        
+        # 引数をインスタンス変数
+        self.main_window = main_window
+        self.canvas = main_window.canvas
+        self.table_name = table_name
+
+        # インスタンス変数
+        self.buttons = {}
+        self.column_entry_list = []
+        
+        self.title('テーブル修正')
+        self.geometry(f'{self.window_width}x{self.window_height}')
+
+        self.buttons['元に戻す'] = tk.Button(self, text='元に戻す', command=self.init_data)
+        self.buttons['列追加'] = tk.Button(self, text='列追加', command=self.add_entry)
+        self.buttons['修正'] = tk.Button(self, text='修正', command=self.edit_table)
+        self.buttons['キャンセル'] = tk.Button(self, text='キャンセル', command=self.destroy)
+        self.buttons['元に戻す'].grid(row=1, column=0)
+        self.buttons['列追加'].grid(row=1, column=1)
+        self.buttons['修正'].grid(row=1, column=2)
+        self.buttons['キャンセル'].grid(row=1, column=3)
+
+        label_table_name = tk.Label(self, text='テーブル名', anchor='center')
+        self.entry_table_name = tk.Entry(self, width=20)
+        label_table_name.grid(row=2, column=0, columnspan=1)
+        self.entry_table_name.grid(row=2, column=2, columnspan=3)
+
+        self.init_data()
+
+    def init_data(self):
+        self.entry_table_name.delete(0, tk.END)
+        for l, e in self.column_entry_list:
+            l.destroy()
+            e.destroy()
+        self.column_entry_list = []
+
+        self.entry_table_name.insert(0, self.table_name)
+
+        columns = get_table_columns(self.table_name)
+        while len(self.column_entry_list) < len(columns):
+            self.add_entry()
+        for i in range(0, len(columns)):
+            self.column_entry_list[i][1].insert(0, columns[i])
+
+    def add_entry(self):
+        label = tk.Label(self, text=f'列{len(self.column_entry_list)+1}', anchor='center')
+        entry = tk.Entry(self, width=20)
+        label.grid(row=len(self.column_entry_list)+3, column=0, columnspan=1)
+        entry.grid(row=len(self.column_entry_list)+3, column=2, columnspan=3)
+        self.column_entry_list.append([label, entry])
+
+    def edit_table(self):
+        new_table_name = self.entry_table_name.get()
+        if new_table_name == '':
+            return
+        
+        columns = []
+        for _, e in self.column_entry_list:
+            columns.append(e.get())
+        
+        # 画面への反映は変更通知で行う
+        with db.transaction():
+            update_table(self.table_name, new_table_name)
+            update_columns(new_table_name, columns)
+
+        self.destroy()
+
+class RegistERWindow(tk.Toplevel):
+    def __init__(self, main_window):
+        super().__init__()
+
+        # 定数
+        self.window_width = 700
+        self.window_height = 600
+        
+        # 引数をインスタンス変数
+        self.main_window = main_window
+        self.canvas = main_window.canvas
+
+        # インスタンス変数
+        self.buttons = {}
+        self.canvases = {}
+        self.table_radiobtn = {'left': {}, 'right': {}}
+        self.column_radiobtn = {'left': {}, 'right': {}}
+        self.table_radiobtn_value = {'left': tk.StringVar(value=''), 'right': tk.StringVar(value='')}
+        self.column_radiobtn_value = {'left': tk.StringVar(value=''), 'right': tk.StringVar(value='')}
+        
+        self.title('ER追加')
+        self.geometry(f'{self.window_width}x{self.window_height}')
+
+        button_frame = tk.Frame(self, background='white')
+        self.buttons['完了'] = tk.Button(button_frame, text='完了', command=self.commit)
+        self.buttons['キャンセル'] = tk.Button(button_frame, text='キャンセル', command=self.destroy)
+        self.buttons['完了'].grid(row=0, column=1, sticky='w')
+        self.buttons['キャンセル'].grid(row=0, column=2, sticky='w')
+        button_frame.grid(row=0, column=0, columnspan=4)
+
+        self.canvases['left_table'] = tk.Canvas(self, width=150, height=550, background='white')
+        self.draw_table('left')
+        self.canvases['left_table'].grid(row=1, column=0, rowspan=3)
+
+        self.canvases['connection_table'] = tk.Canvas(self, width=300, height=250, background='white')
+        self.canvases['connection_table'].grid(row=1, column=1, columnspan=2)
+
+        self.canvases['right_table'] = tk.Canvas(self, width=150, height=550, background='white')
+        self.draw_table('right')
+        self.canvases['right_table'].grid(row=1, column=3, rowspan=3)
+
+        self.buttons['ER追加'] = tk.Button(self, text='ER追加', command=self.add_er)
+        self.buttons['ER追加'].grid(row=2, column=1)
+        self.buttons['ER削除'] = tk.Button(self, text='ER削除', command=self.del_er)
+        self.buttons['ER削除'].grid(row=2, column=2)
+
+        self.canvases['left_column'] = tk.Canvas(self, width=150, height=250, background='white')
+        self.canvases['left_column'].grid(row=3, column=1)
+
+
+        self.canvases['right_column'] = tk.Canvas(self, width=150, height=250, background='white')
+        self.canvases['right_column'].grid(row=3, column=2)
+
+    def draw_table(self, side):
+        table_list = get_tables()
+        height_seq = 0
+        for table in table_list:
+            if self.table_radiobtn_value['right' if side=='left' else 'left'].get() != table:
+                self.table_radiobtn[side][table] = tk.Radiobutton(self.canvases[f'{side}_table'], text=table, command=lambda : self.table_click('left'), variable=self.table_radiobtn_value['left'], value=table, background='white', font=('', 15))
+                self.table_radiobtn[side][table].place(x=0, y=height_seq)
+                self.table_radiobtn[side][table].update_idletasks()
+                if height_seq == 0:
+                    self.table_radiobtn[side][table].invoke()
+                height_seq += self.table_radiobtn[side][table].winfo_height()
+
+    def draw_columns(self, side):
+        pass
+
+    def add_er(self):
+        pass
+
+    def del_er(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def table_click(self, side):
+        if ('right_table' if side=='left' else 'left_table') in self.canvases:
+            self.draw_table('right' if side=='left' else 'left')
+
+
+class PathWindow(tk.Toplevel):
+    def __init__(self, main_window):
+        super().__init__()
+
+        # 定数
+        self.window_width = 700
+        self.window_height = 400
+
+        # 引数をインスタンス変数
+        self.main_window = main_window
+
+        # インスタンス変数
+        self.buttons = {}
+        self.list_views = {}
+        self.paths = []
+        self.start_table = tk.StringVar(value=main_window.get_selected_table() or '')
+        self.end_table = tk.StringVar(value='')
+        self.path_count = tk.IntVar(value=3)
+
+        self.title('経路検索')
+        self.geometry(f'{self.window_width}x{self.window_height}')
+        self.protocol('WM_DELETE_WINDOW', self.close)
+
+        condition_frame = tk.Frame(self)
+        tables = get_tables()
+        tk.Label(condition_frame, text='開始').grid(row=0, column=0)
+        ttk.Combobox(condition_frame, textvariable=self.start_table, values=tables).grid(row=0, column=1)
+        tk.Label(condition_frame, text='終了').grid(row=0, column=2)
+        ttk.Combobox(condition_frame, textvariable=self.end_table, values=tables).grid(row=0, column=3)
+        tk.Label(condition_frame, text='本数').grid(row=0, column=4)
+        tk.Spinbox(condition_frame, textvariable=self.path_count, from_=1, to=10, width=3).grid(row=0, column=5)
+        self.buttons['検索'] = tk.Button(condition_frame, text='検索', command=self.find_paths)
+        self.buttons['閉じる'] = tk.Button(condition_frame, text='閉じる', command=self.close)
+        self.buttons['検索'].grid(row=0, column=6)
+        self.buttons['閉じる'].grid(row=0, column=7)
+        condition_frame.grid(row=0, column=0, sticky='w')
+
+        self.list_views['経路一覧'] = ttk.Treeview(self, show='headings', columns=('hops', 'path'), selectmode='browse', height=5)
+        self.list_views['経路一覧'].bind('<<TreeviewSelect>>', self.path_select)
+        self.list_views['経路一覧'].heading('hops', text='接続数', anchor='center')
+        self.list_views['経路一覧'].heading('path', text='経路', anchor='center')
+        self.list_views['経路一覧'].column('hops', width=60, anchor='center')
+        self.list_views['経路一覧'].column('path', width=620, anchor='w')
+        self.list_views['経路一覧'].grid(row=1, column=0, sticky='nsew')
+
+        self.list_views['経路詳細'] = ttk.Treeview(self, show='headings', columns=('from', 'to', 'keys'), selectmode='none', height=8)
+        self.list_views['経路詳細'].heading('from', text='元テーブル', anchor='center')
+        self.list_views['経路詳細'].heading('to', text='先テーブル', anchor='center')
+        self.list_views['経路詳細'].heading('keys', text='結合キー', anchor='center')
+        self.list_views['経路詳細'].column('from', width=150, anchor='w')
+        self.list_views['経路詳細'].column('to', width=150, anchor='w')
+        self.list_views['経路詳細'].column('keys', width=380, anchor='w')
+        self.list_views['経路詳細'].grid(row=2, column=0, sticky='nsew')
+
+    def find_paths(self):
+        for view in self.list_views.values():
+            view.delete(*view.get_children())
+        self.paths = find_join_paths(self.start_table.get(), self.end_table.get(), self.path_count.get())
+        if len(self.paths) == 0:
+            self.main_window.clear_path()
+            return
+        for i, path in enumerate(self.paths):
+            tables = [self.start_table.get()] + [to_table for _, to_table, _ in path]
+            self.list_views['経路一覧'].insert(parent='', index='end', iid=i, values=(len(path), ' → '.join(tables)))
+        self.list_views['経路一覧'].selection_set(0)
+
+    def path_select(self, event):
+        selection = self.list_views['経路一覧'].selection()
+        if len(selection) == 0:
+            return
+        path = self.paths[int(selection[0])]
+        view = self.list_views['経路詳細']
+        view.delete(*view.get_children())
+        for i, (from_table, to_table, keys) in enumerate(path):
+            view.insert(parent='', index='end', iid=i, values=(from_table, to_table, ', '.join(f'{from_column} = {to_column}' for from_column, to_column, _ in keys)))
+        self.main_window.show_path(self.start_table.get(), path)
+
+    def close(self):
+        self.main_window.clear_path()
+        self.destroy()
+
+class MainWindow(tk.Tk):
+    def __init__(self):
+        self.table_list = {}
+        self.connect_list = {}
+        self.table_list_values = {}
+        self.connection_rows = []
+        self.connection_row_slots = {}
+        self.connection_row_pool = []
+        self.connection_list_after = None
+        self.layout_changes = {}
+        self.layout_after = None
+        self.highlighted = None
+        self.path_highlights = []
+        self.layout_thread = None
+        self.layout_cancel = None
+        self.layout_queue = queue.Queue()
+        self.profile_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.profile_cancel = threading.Event()
+        
+        self.buttons = {}
+        self.list_views = {}
+
+        super().__init__()
+        # Tk変数はルートウィンドウを作った後でないと作れない
+        self.connection_var = tk.StringVar(value='')
+        self.title('ER図')
+        self.geometry(f'{window_width}x{window_height}')
+
+        canvas_frame = tk.Frame(self)
+        self.canvas = tk.Canvas(canvas_frame, width=canvas_width, height=canvas_height, background='white')
+        self.canvas.grid(row=0, column=0)
+        self.canvas_xscrollbar = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.canvas_xscrollbar.grid(row=1, column=0, sticky='ew')
+        self.canvas_yscrollbar = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas_yscrollbar.grid(row=0, column=1, sticky='ns')
+        self.canvas.configure(xscrollcommand=self.scroll_canvas_x, yscrollcommand=self.scroll_canvas_y)
+        # ホイールで縦、Shift+ホイールで横にスクロール、Ctrl+ホイールで拡大・縮小、中ボタンのドラッグで移動
+        self.canvas.bind('<MouseWheel>', lambda event: self.wheel_canvas(event, 1 if event.delta > 0 else -1))
+        self.canvas.bind('<Button-4>', lambda event: self.wheel_canvas(event, 1))
+        self.canvas.bind('<Button-5>', lambda event: self.wheel_canvas(event, -1))
+        self.canvas.bind('<ButtonPress-2>', lambda event: self.canvas.scan_mark(event.x, event.y))
+        self.canvas.bind('<B2-Motion>', lambda event: self.canvas.scan_dragto(event.x, event.y, gain=1))
+        self.canvas.bind('<Configure>', lambda event: get_scene(self.canvas).schedule_view())
+        canvas_frame.grid(row=0, column=0, rowspan=3)
+        self.canvas.update_idletasks()
+
+        table_list_frame = tk.Frame(self)
+        self.list_views['テーブル一覧'] = ttk.Treeview(table_list_frame, show='headings', columns=('name', 'connect_num'), selectmode='browse', height=5)
+        self.list_views['テーブル一覧'].bind('<<TreeviewSelect>>', self.view_select)
+        self.list_views['テーブル一覧'].heading('name', text='テーブル名', anchor='center')
+        self.list_views['テーブル一覧'].heading('connect_num', text='接続数', anchor='center')
+        self.list_views['テーブル一覧'].column('name', width=150, anchor='center')
+        self.list_views['テーブル一覧'].column('connect_num', width=75, anchor='center')
+        self.list_views['テーブル一覧'].grid(row=0,column=0, rowspan=5)
+
+        self.buttons['テーブル登録'] = tk.Button(table_list_frame, text='テーブル登録', command=self.regist_window)
+        self.buttons['テーブルコピー'] = tk.Button(table_list_frame, text='テーブルコピー', command=self.copy_table)
+        self.buttons['テーブル修正'] = tk.Button(table_list_frame, text='テーブル修正', command=self.edit_window)
+        self.buttons['テーブル削除'] = tk.Button(table_list_frame, text='テーブル削除', command=self.delete_table)
+        self.buttons['自動レイアウト'] = tk.Button(table_list_frame, text='自動レイアウト', command=self.auto_layout)
+        self.buttons['自動レイアウト'].grid(row=0, column=1)
+        self.buttons['テーブル登録'].grid(row=1, column=1)
+        self.buttons['DB取り込み'] = tk.Button(table_list_frame, text='DB取り込み', command=self.import_db)
+        self.buttons['DB取り込み'].grid(row=1, column=2)
+        self.buttons['テーブルコピー'].grid(row=2, column=1)
+        self.buttons['テーブル修正'].grid(row=3, column=1)
+        self.buttons['テーブル削除'].grid(row=4, column=1)
+        self.search_var = tk.StringVar(value='')
+        self.search_var.trace_add('write', lambda *args: self.search())
+        self.search_entry = tk.Entry(table_list_frame, textvariable=self.search_var)
+        self.search_entry.grid(row=5, column=0, sticky='ew')
+        tk.Label(table_list_frame, text='検索').grid(row=5, column=1)
+        self.list_views['検索結果'] = ttk.Treeview(table_list_frame, show='headings', columns=('table', 'column'), selectmode='browse', height=5)
+        self.list_views['検索結果'].bind('<<TreeviewSelect>>', self.search_select)
+        self.list_views['検索結果'].heading('table', text='テーブル名', anchor='center')
+        self.list_views['検索結果'].heading('column', text='列名', anchor='center')
+        self.list_views['検索結果'].column('table', width=150, anchor='w')
+        self.list_views['検索結果'].column('column', width=150, anchor='w')
+        self.list_views['検索結果'].grid(row=6, column=0, columnspan=2)
+        table_list_frame.grid(row=0, column=1, sticky='nsew')
+
+        table_detail_frame = tk.Frame(self)
+        self.list_views['カラム一覧'] = ttk.Treeview(table_detail_frame, show='headings', columns=('name', 'type', 'unique'), selectmode='none', height=10)
+        self.list_views['カラム一覧'].heading('name', text='列名', anchor='center')
+        self.list_views['カラム一覧'].heading('type', text='型', anchor='center')
+        self.list_views['カラム一覧'].heading('unique', text='ユニーク制約', anchor='center')
+        self.list_views['カラム一覧'].column('name', width=150, anchor='w')
+        self.list_views['カラム一覧'].column('type', width=75, anchor='center')
+        self.list_views['カラム一覧'].column('unique', width=75, anchor='center')
+        self.list_views['カラム一覧'].grid(row=0,column=0, rowspan=5, sticky='nsew')
+        table_detail_frame.grid(row=1, column=1, sticky='nsew')
+
+        connect_list_frame = tk.Frame(self)
+        self.buttons['ER追加'] = tk.Button(connect_list_frame, text='ER追加', command=self.regist_er)
+        self.buttons['ER修正'] = tk.Button(connect_list_frame, text='ER修正', command=self.regist_er)
+        self.buttons['ER削除'] = tk.Button(connect_list_frame, text='ER削除', command=self.delete_er)
+        self.buttons['ER追加'].grid(row=0, column=0, sticky='w')
+        self.buttons['ER修正'].grid(row=0, column=1, sticky='w')
+        self.buttons['ER削除'].grid(row=0, column=2, sticky='w')
+        self.buttons['経路検索'] = tk.Button(connect_list_frame, text='経路検索', command=self.path_window)
+        self.buttons['経路検索'].grid(row=0, column=3, sticky='w')
+        self.canvas_connect_list = tk.Canvas(connect_list_frame, height=400, background='white')
+        self.canvas_connect_list.grid(row=1, column=0, columnspan=15)
+        self.connect_list_scrollbar = tk.Scrollbar(connect_list_frame, orient=tk.VERTICAL, command=self.canvas_connect_list.yview)
+        self.connect_list_scrollbar.grid(row=1, column=15, sticky='ns')
+        self.canvas_connect_list.configure(yscrollcommand=self.scroll_connection_list, yscrollincrement=measure_text('-----', 15)[1])
+        self.canvas_connect_list.bind('<MouseWheel>', lambda event: self.canvas_connect_list.yview_scroll(-event.delta//120, 'units'))
+        self.canvas_connect_list.bind('<Button-4>', lambda event: self.canvas_connect_list.yview_scroll(-1, 'units'))
+        self.canvas_connect_list.bind('<Button-5>', lambda event: self.canvas_connect_list.yview_scroll(1, 'units'))
+        self.canvas_connect_list.update_idletasks()
+        connect_list_frame.grid(row=2, column=1, sticky='nsew')
+
+        #insert_connection('ターゲット', '店舗マスタ', [['得意先コード', '得意先コード']], [None])
+        #insert_connection('ターゲット', '店舗マスタ', [['点数', '冷凍棚数']], [None])
+        #self.draw_table_list()
+
+        #entity1 = Entity(self.canvas, Point(40, 80), 'ターゲット')
+        #entity2 = Entity(self.canvas, Point(800, 300), '店舗マスタ')
+        #Connection(self.canvas, entity1, entity2)
+        
+        self.draw()
+        add_change_listener(self.on_change)
+        self.catalog_generation = get_catalog_generation()
+        self.after(external_check_interval, self.check_external_changes)
+        self.protocol('WM_DELETE_WINDOW', self.close)
+        
+
+    def draw(self):
+        self.draw_table_list()
+        self.draw_columns_list()
+        self.draw_entity()
+        self.draw_connection()
+        self.draw_connection_list()
+
+    def draw_entity(self):
+        tables = [table for table in get_tables() if get_table_no(table) not in self.table_list]
+        # 配置の前にまとめて大きさを測っておく
+        measure_texts(tables, 20)
+        # 保存済みの配置は1回でまとめて読む
+        layouts = get_layouts()
+        for table in tables:
+            self.draw_table_entity(get_table_no(table), table, layouts.get(get_table_no(table)))
+
+    def draw_table_entity(self, table_no, table_name, layout=None):
+        if layout is None:
+            # 今見えている範囲のどこかに置く
+            x1, y1, x2, y2 = get_scene(self.canvas).get_view()
+            self.table_list[table_no] = Entity(self, self.canvas, Point(random.randint(int(x1), int(x2)), random.randint(int(y1), int(y2))), table_name)
+            self.entity_moved(self.table_list[table_no])
+        else:
+            # Entityは受け取った位置に1を足すので戻しておく
+            self.table_list[table_no] = Entity(self, self.canvas, Point(layout[0]-1, layout[1]-1), table_name)
+
+    def entity_moved(self, entity):
+        # 動かした位置は溜めておき、少し待ってからまとめて書き込む
+        self.layout_changes[get_table_no(entity.text)] = (entity.point.x, entity.point.y)
+        self.schedule_save_layout()
+
+    def check_external_changes(self):
+        # データ層が読み直されていたら、画面を今の内容に合わせる
+        generation = get_catalog_generation()
+        if generation != self.catalog_generation:
+            self.catalog_generation = generation
+            self.reload()
+        self.after(external_check_interval, self.check_external_changes)
+
+    def reload(self):
+        # 消えたテーブルの線を先に外してからエンティティを消す
+        for start_table_no, end_table_no in list(self.connect_list):
+            self.draw_connection_pair(start_table_no, end_table_no)
+        for table_no, entity in list(self.table_list.items()):
+            table_name = get_table_name(table_no)
+            if table_name is None:
+                self.table_list.pop(table_no).destroy()
+                self.layout_changes.pop(table_no, None)
+            elif entity.text != table_name:
+                entity.update_text(table_name)
+                for connection in entity.connections:
+                    connection.move(entity)
+        self.draw_entity()
+        self.draw_connection()
+        self.draw_table_list()
+        self.draw_columns_list()
+        self.schedule_connection_list()
+
+    def schedule_save_layout(self):
+        if self.layout_after is not None:
+            self.after_cancel(self.layout_after)
+        self.layout_after = self.after(layout_save_delay, self.save_layout)
+
+    def save_layout(self):
+        self.layout_after = None
+        if len(self.layout_changes) > 0:
+            save_layouts(self.layout_changes)
+            self.layout_changes = {}
+
+    def scroll_canvas_x(self, first, last):
+        self.canvas_xscrollbar.set(first, last)
+        get_scene(self.canvas).schedule_view()
+
+    def scroll_canvas_y(self, first, last):
+        self.canvas_yscrollbar.set(first, last)
+        get_scene(self.canvas).schedule_view()
+
+    def wheel_canvas(self, event, direction):
+        if event.state & 4:
+            scene = get_scene(self.canvas)
+            scene.set_scale(scene.scale * (1.2 if direction > 0 else 1/1.2), event.x, event.y)
+        elif event.state & 1:
+            self.canvas.xview_scroll(-direction, 'units')
+        else:
+            self.canvas.yview_scroll(-direction, 'units')
+
+    def auto_layout(self):
+        # 実行中に押されたら中止する
+        if self.layout_thread is not None:
+            self.layout_cancel.set()
+            return
+        try:
+            import numpy
+        except ImportError:
+            print('自動レイアウトにはnumpyが必要です')
+            return
+        table_nos = list(self.table_list)
+        if len(table_nos) == 0:
+            return
+        index = {table_no: i for i, table_no in enumerate(table_nos)}
+        sizes = [(self.table_list[table_no].width, self.table_list[table_no].height) for table_no in table_nos]
+        positions = [(self.table_list[table_no].point.x + self.table_list[table_no].width/2, self.table_list[table_no].point.y + self.table_list[table_no].height/2) for table_no in table_nos]
+        edges = [(index[start_no], index[end_no]) for start_no, end_no in self.connect_list if start_no in index and end_no in index]
+        self.layout_cancel = threading.Event()
+        self.layout_queue = queue.Queue()
+        self.layout_thread = threading.Thread(target=self.run_layout, args=(sizes, edges, positions, self.layout_cancel, self.layout_queue), daemon=True)
+        self.layout_thread.start()
+        self.buttons['自動レイアウト'].configure(text='中止')
+        self.after(50, self.check_layout, table_nos)
+
+    def run_layout(self, sizes, edges, positions, cancel_event, result_queue):
+        # 別スレッドでは計算だけ行い、キャンバスには触らない
+        try:
+            for points in force_layout(sizes, edges, positions, cancel_event=cancel_event):
+                result_queue.put(points)
+        finally:
+            result_queue.put(None)
+
+    def check_layout(self, table_nos):
+        # 溜まった途中経過は最新のものだけ反映する
+        points = None
+        finished = False
+        while True:
+            try:
+                item = self.layout_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+            else:
+                points = item
+        if points is not None:
+            for table_no, (x, y) in zip(table_nos, points.tolist()):
+                entity = self.table_list.get(table_no)
+                if entity is None:
+                    continue
+                entity.move_to(x, y)
+                self.layout_changes[table_no] = (entity.point.x, entity.point.y)
+            self.schedule_save_layout()
+        if finished:
+            self.layout_thread = None
+            self.layout_cancel = None
+            self.buttons['自動レイアウト'].configure(text='自動レイアウト')
+        else:
+            self.after(50, self.check_layout, table_nos)
+
+    def close(self):
+        if self.layout_cancel is not None:
+            self.layout_cancel.set()
+        if self.layout_after is not None:
+            self.after_cancel(self.layout_after)
+        # 推定中のファイルがあっても終了を待たせない
+        self.profile_cancel.set()
+        self.profile_executor.shutdown(wait=False, cancel_futures=True)
+        self.save_layout()
+        self.destroy()
+
+    def draw_connection(self):
+        tables, _ = get_connection()
+        for st, es in tables:
+            if (get_table_no(st), get_table_no(es)) not in self.connect_list:
+                self.draw_connection_pair(get_table_no(st), get_table_no(es))
+
+    def draw_connection_pair(self, start_table_no, end_table_no):
+        # 開始→終了テーブルの組ごとに1本の線を引く
+        key = (start_table_no, end_table_no)
+        rows = get_connection_keys(get_table_name(start_table_no), get_table_name(end_table_no))
+        if len(rows) == 0:
+            if key in self.connect_list:
+                self.connect_list[key].destroy()
+                del self.connect_list[key]
+            return
+        color = 'black'
+        for row in rows:
+            if row[2] is not None:
+                color = 'red'
+                break
+        if key in self.connect_list:
+            self.connect_list[key].set_color(color)
+        else:
+            self.connect_list[key] = Connection(self.canvas, self.table_list[start_table_no], self.table_list[end_table_no], color=color)
+
+    def draw_table_list(self):
+        table_list = get_tables()
+        connect_nums = get_connection_counts()
+        table_nos = set()
+        for table in table_list:
+            table_nos.add(get_table_no(table))
+            self.draw_table_list_row(get_table_no(table), (table, connect_nums.get(table, 0)))
+        for table_no in list(self.table_list_values):
+            if table_no not in table_nos:
+                self.draw_table_list_row(table_no)
+
+    def draw_table_list_row(self, table_no, values=None):
+        view = self.list_views['テーブル一覧']
+        if values is None:
+            table_name = get_table_name(table_no)
+            values = None if table_name is None else (table_name, get_connection_count(table_name))
+        if values is None:
+            if view.exists(table_no):
+                view.delete(table_no)
+            self.table_list_values.pop(table_no, None)
+            return
+        # 名前か接続数が変わった行だけ更新する
+        if self.table_list_values.get(table_no) == values:
+            return
+        if view.exists(table_no):
+            view.item(table_no, values=values)
+        else:
+            view.insert(parent='', index='end', iid=table_no, values=values)
+        self.table_list_values[table_no] = values
+
+    def get_selected_table(self):
+        slct_index = self.list_views['テーブル一覧'].focus()
+        if slct_index == '' or not self.list_views['テーブル一覧'].exists(slct_index):
+            return None
+        return get_table_name(int(slct_index))
+    
+    def draw_columns_list(self):
+        self.list_views['カラム一覧'].delete(*self.list_views['カラム一覧'].get_children())
+        table_name = self.get_selected_table()
+        if table_name is None:
+            return
+        columns = get_table_column_details(table_name)
+        for i, (column, type, unique_flag) in enumerate(columns):
+            self.list_views['カラム一覧'].insert(parent='', index='end', iid=i, values=(column, type or '', '○' if unique_flag == '1' else ''))
+
+    def on_change(self, event):
+        # データ層からの変更通知ごとに、影響する部分だけ描き直す
+        if isinstance(event, TableAdded):
+            self.draw_table_entity(event.table_no, event.table_name)
+            self.draw_table_list_row(event.table_no)
+        elif isinstance(event, TableRenamed):
+            entity = self.table_list[event.table_no]
+            entity.update_text(event.table_name)
+            for connection in entity.connections:
+                connection.move(entity)
+            self.draw_table_list_row(event.table_no)
+            self.schedule_connection_list()
+        elif isinstance(event, TableDeleted):
+            self.table_list.pop(event.table_no).destroy()
+            self.layout_changes.pop(event.table_no, None)
+            self.draw_table_list_row(event.table_no)
+            self.draw_columns_list()
+        elif isinstance(event, ColumnsChanged):
+            if self.get_selected_table() == event.table_name:
+                self.draw_columns_list()
+            self.schedule_connection_list()
+        elif isinstance(event, (ConnectionAdded, ConnectionRemoved)):
+            self.draw_connection_pair(event.start_table_no, event.end_table_no)
+            self.draw_table_list_row(event.start_table_no)
+            self.draw_table_list_row(event.end_table_no)
+            self.schedule_connection_list()
+        elif isinstance(event, ConnectionChanged):
+            self.schedule_connection_list()
+
+    def schedule_connection_list(self):
+        # 1回の変更で複数の通知が来ても接続一覧の再計算は1度だけにする
+        if self.connection_list_after is None:
+            self.connection_list_after = self.after_idle(self.draw_connection_list)
+
+    def draw_connection_list(self):
+        self.connection_list_after = None
+        tables, keys = get_connection()
+        # 接続ごとに見出し行と列の対応行に展開する
+        rows = []
+        con_keys = set()
+        for st, es in tables:
+            con_key = f'{st}-{es}'
+            if con_key in con_keys:
+                continue
+            con_keys.add(con_key)
+            color = 'black'
+            for key in keys[con_key]:
+                if key[2] is not None:
+                    color = 'red'
+                    break
+            start_cardinality, end_cardinality = keys[con_key][0][3:5]
+            rows.append(('pair', con_key, st, es, f' {start_cardinality or "?"}-{end_cardinality or "?"} ', color))
+            for key in keys[con_key]:
+                rows.append(('key', con_key, f' {key[0]}', f'{key[1]} ', color))
+        self.connection_rows = rows
+
+        row_height = measure_text('-----', 15)[1]
+        self.canvas_connect_list.configure(scrollregion=(0, 0, self.canvas_connect_list.winfo_width(), len(rows)*row_height))
+        self.draw_visible_connection_rows()
+
+    def scroll_connection_list(self, first, last):
+        self.connect_list_scrollbar.set(first, last)
+        self.draw_visible_connection_rows()
+
+    def draw_visible_connection_rows(self):
+        # 表示範囲に入っている行だけ描画し、行の部品は使い回す
+        row_height = measure_text('-----', 15)[1]
+        top = self.canvas_connect_list.canvasy(0)
+        bottom = self.canvas_connect_list.canvasy(self.canvas_connect_list.winfo_height())
+        visible = range(max(0, int(top // row_height)), min(len(self.connection_rows), int(bottom // row_height) + 1))
+
+        for index in list(self.connection_row_slots):
+            if index not in visible:
+                slot = self.connection_row_slots.pop(index)
+                slot.hide()
+                self.connection_row_pool.append(slot)
+        for index in visible:
+            slot = self.connection_row_slots.get(index)
+            if slot is None:
+                slot = self.connection_row_pool.pop() if len(self.connection_row_pool) > 0 else ConnectionListRow(self.canvas_connect_list, self.connection_var)
+                self.connection_row_slots[index] = slot
+            slot.show(self.connection_rows[index], index*row_height)
+
+    def regist_window(self):
+        RegistWindow(self)
+
+    def import_db(self):
+        filenames = tk.filedialog.askopenfilenames(parent=self, filetypes=[("SQLite", ".db .sqlite .sqlite3"), ("", "*")], initialdir=os.path.abspath(os.path.dirname(__file__)))
+        if len(filenames) == 0:
+            return
+        counts, skipped, _ = import_sqlite_files(filenames)
+        for filename, reason in skipped:
+            print(f'スキップ: {filename} ({reason})')
+        print(f'追加{counts["added"]}件 / 変更{counts["changed"]}件 / 削除{counts["deleted"]}件')
+
+    def profile_table(self, table_name, filename):
+        # 重い読み込みは別スレッドで行い、結果だけメインスレッドで書き込む
+        future = self.profile_executor.submit(profile_csv_file, filename, None, self.profile_cancel)
+        self.after(100, self.check_profile, table_name, future)
+
+    def check_profile(self, table_name, future):
+        if not future.done():
+            self.after(100, self.check_profile, table_name, future)
+            return
+        if future.cancelled() or future.result() is None:
+            return
+        columns, profiles = future.result()
+        update_column_profiles(table_name, columns, profiles)
+
+    def copy_table(self):
+        ori_table_name = self.get_selected_table()
+        if ori_table_name is None:
+            return
+        table_list = get_tables()
+        columns = get_table_columns(ori_table_name)
+        table_name = ori_table_name
+        num = 1
+        while table_name in table_list:
+            table_name = f'{ori_table_name}_{num}'
+            num += 1
+        insert_table(table_name, columns)
+
+    def edit_window(self):
+        table_name = self.get_selected_table()
+        if table_name is None:
+            return
+        EditWindow(self, table_name)
+
+    def delete_table(self):
+        table_name = self.get_selected_table()
+        if table_name is None:
+            return
+        delete_table(table_name)
+
+    def view_select(self, event):
+        self.draw_columns_list()
+
+    def path_window(self):
+        PathWindow(self)
+
+    def show_path(self, start_table, path):
+        # 経路上のテーブルと線を強調し、経路全体が見えるように表示する
+        self.clear_path()
+        table_nos = [get_table_no(start_table)] + [get_table_no(to_table) for _, to_table, _ in path]
+        if any(table_no not in self.table_list for table_no in table_nos):
+            return
+        for table_no in table_nos:
+            self.path_highlights.append(self.table_list[table_no])
+        for start_no, end_no in zip(table_nos, table_nos[1:]):
+            for key in ((start_no, end_no), (end_no, start_no)):
+                if key in self.connect_list:
+                    self.path_highlights.append(self.connect_list[key])
+        for item in self.path_highlights:
+            item.set_highlight(True)
+
+        entities = [self.table_list[table_no] for table_no in table_nos]
+        x1 = min(entity.point.x for entity in entities)
+        y1 = min(entity.point.y for entity in entities)
+        x2 = max(entity.point.x + entity.width for entity in entities)
+        y2 = max(entity.point.y + entity.height for entity in entities)
+        scene = get_scene(self.canvas)
+        width, height = scene.get_size()
+        scale = min(1.0, width / (x2 - x1 + view_margin), height / (y2 - y1 + view_margin))
+        if scale < scene.scale or scene.tier > 0:
+            scene.set_scale(scale, 0, 0)
+        scene.scroll_to((x1 + x2) / 2, (y1 + y2) / 2)
+
+    def clear_path(self):
+        for item in self.path_highlights:
+            item.set_highlight(False)
+        self.path_highlights = []
+
+    def search(self):
+        view = self.list_views['検索結果']
+        view.delete(*view.get_children())
+        for i, (table_name, column) in enumerate(search_names(self.search_var.get())):
+            view.insert(parent='', index='end', iid=i, values=(table_name, column or ''))
+
+    def search_select(self, event):
+        selection = self.list_views['検索結果'].selection()
+        if len(selection) == 0:
+            return
+        table_no = get_table_no(self.list_views['検索結果'].set(selection[0], 'table'))
+        if table_no is None or table_no not in self.table_list:
+            return
+        self.list_views['テーブル一覧'].selection_set(table_no)
+        self.list_views['テーブル一覧'].focus(table_no)
+        self.list_views['テーブル一覧'].see(table_no)
+        self.show_entity(table_no)
+
+    def show_entity(self, table_no):
+        # 見つけたエンティティを強調し、読める大きさで画面の中央に出す
+        if self.highlighted in self.table_list:
+            self.table_list[self.highlighted].set_highlight(False)
+        self.highlighted = table_no
+        entity = self.table_list[table_no]
+        entity.set_highlight(True)
+        scene = get_scene(self.canvas)
+        if scene.tier > 0:
+            scene.set_scale(1.0, 0, 0)
+        center = entity.get_center()
+        scene.scroll_to(center.x, center.y)
+
+    def regist_er(self):
+        RegistERWindow(self)
+
+    def delete_er(self):
+        pass
@@ -0,0 +1,1791 @@
+import os
+import sqlite3
+import threading
+import contextlib
+import csv
+import json
+import time
+import concurrent.futures
+import itertools
+import heapq
+import hashlib
+import math
+import re
+import array
+import collections
+import unicodedata
+
+db_path = 'table.db'
+# 別プロセスからの書き込みを確かめる間隔（秒）
+data_version_interval = 0.1
+
+# プロファイル時に1ファイルの全列あわせて正確に保持するハッシュ数の上限（超えたら列ごとにHyperLogLogで推定）
+unique_hash_limit = 1000000
+profile_chunk_rows = 20000
+
+# 結合キー探索のMinHash（1回のハッシュをビンに振り分ける方式）のビン数
+minhash_bins = 128
+# LSHの1つのバケツに入る列数の上限（超えたバケツは候補に使わない）
+lsh_bucket_limit = 50
+
+# カーディナリティ判定でメモリに持つキー数の上限（超えたら一時ファイルに分割して書き出す）
+key_memory_limit = 2000000
+spill_partitions = 256
+# 自動レイアウトの「ノード数×反復回数」の上限（ノードが多いときは反復回数を減らす）
+layout_work_limit = 200000
+
+class Database():
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.rollback_listeners = []
+        self.change_listeners = []
+
+    def connect(self):
+        # スレッドごとに接続を1本だけ開いて使い回す
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, cached_statements=256, check_same_thread=False)
+            self.local.conn = conn
+            self.local.depth = 0
+            self.local.events = []
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def execute(self, sql, params=()):
+        return self.connect().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.connect().executemany(sql, seq_of_params)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # 入れ子になった場合は一番外側でまとめてコミットする
+        conn = self.connect()
+        if self.local.depth == 0 and not conn.in_transaction:
+            conn.execute('BEGIN')
+        self.local.depth += 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            self.local.depth -= 1
+            if self.local.depth == 0:
+                conn.rollback()
+                self.local.events = []
+                for listener in self.rollback_listeners:
+                    listener()
+            raise
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            conn.commit()
+            events = self.local.events
+            self.local.events = []
+            for event in events:
+                for listener in self.change_listeners:
+                    listener(event)
+
+    def is_changed_elsewhere(self):
+        # data_versionは他の接続（別プロセスを含む）がコミットしたときだけ変わる
+        # 読み出しのたびに問い合わせないよう、間隔をあけて確かめる
+        conn = self.connect()
+        if self.local.depth > 0 or conn.in_transaction:
+            return False
+        now = time.monotonic()
+        if now - getattr(self.local, 'checked_at', -data_version_interval) < data_version_interval:
+            return False
+        self.local.checked_at = now
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        last_version = getattr(self.local, 'data_version', None)
+        self.local.data_version = data_version
+        return last_version is not None and last_version != data_version
+
+    def emit(self, event):
+        # コミットされるまで変更通知を溜めておく
+        self.local.events.append(event)
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+
+class JoinGraph():
+    def __init__(self, connections):
+        # テーブル番号→位置、位置ごとの隣接先を詰めた配列（CSR）。接続は向きを問わず両方向に持つ
+        adjacency = {}
+        for rowid, connection in connections.items():
+            adjacency.setdefault(connection[0], []).append((connection[1], rowid))
+            adjacency.setdefault(connection[1], []).append((connection[0], rowid))
+        self.index = {}
+        self.offsets = array.array('q', [0])
+        self.targets = array.array('q')
+        self.rowids = array.array('q')
+        for i, (table_no, edges) in enumerate(adjacency.items()):
+            self.index[table_no] = i
+            for neighbor, rowid in edges:
+                self.targets.append(neighbor)
+                self.rowids.append(rowid)
+            self.offsets.append(len(self.targets))
+        # 作った後の追加・削除は差分として持ち、溜まったら作り直す
+        self.added = {}
+        self.added_rowids = set()
+        self.removed = set()
+        self.stale = False
+
+    def add(self, rowid, start_no, end_no):
+        if rowid in self.removed:
+            # 削除した行番号が再利用されたので差分では表せない
+            self.stale = True
+            return
+        self.added.setdefault(start_no, []).append((end_no, rowid))
+        self.added.setdefault(end_no, []).append((start_no, rowid))
+        self.added_rowids.add(rowid)
+        self.check_size()
+
+    def remove(self, rowid):
+        self.removed.add(rowid)
+        self.check_size()
+
+    def check_size(self):
+        if len(self.added_rowids) + len(self.removed) > max(1000, len(self.targets) // 4):
+            self.stale = True
+
+    def neighbors(self, table_no):
+        i = self.index.get(table_no)
+        if i is not None:
+            for j in range(self.offsets[i], self.offsets[i+1]):
+                if self.rowids[j] not in self.removed:
+                    yield self.targets[j]
+        for neighbor, rowid in self.added.get(table_no, ()):
+            if rowid not in self.removed:
+                yield neighbor
+
+    def shortest_path(self, start_no, end_no, banned_nodes=(), banned_edges=()):
+        # 幅優先探索で接続の数が最少の経路（テーブル番号の並び）を返す
+        parents = {start_no: None}
+        queue = collections.deque([start_no])
+        while len(queue) > 0 and end_no not in parents:
+            node = queue.popleft()
+            for neighbor in self.neighbors(node):
+                if neighbor in parents or neighbor in banned_nodes or (node, neighbor) in banned_edges:
+                    continue
+                parents[neighbor] = node
+                queue.append(neighbor)
+        if end_no not in parents:
+            return None
+        path = [end_no]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+    def shortest_paths(self, start_no, end_no, k=1):
+        # Yenの方法で短い順にk本の経路を求める（同じテーブルは2回通らない）
+        path = self.shortest_path(start_no, end_no)
+        if path is None:
+            return []
+        paths = [path]
+        seen = {tuple(path)}
+        candidates = []
+        while len(paths) < k:
+            last = paths[-1]
+            for i in range(len(last) - 1):
+                root = last[:i+1]
+                banned_edges = {(p[i], p[i+1]) for p in paths if p[:i+1] == root}
+                spur = self.shortest_path(root[-1], end_no, set(root[:-1]), banned_edges)
+                if spur is None:
+                    continue
+                path = root[:-1] + spur
+                if tuple(path) not in seen:
+                    seen.add(tuple(path))
+                    heapq.heappush(candidates, (len(path), path))
+            if len(candidates) == 0:
+                break
+            paths.append(heapq.heappop(candidates)[1])
+        return paths
+
+class Catalog():
+    def __init__(self, db):
+        self.db = db
+        self.loaded = False
+        # 読み直すたびに増える（画面側はこれで描き直しが必要か判断する）
+        self.generation = 0
+        # ロールバックされたら読み直す
+        db.rollback_listeners.append(self.invalidate)
+
+    def invalidate(self):
+        self.loaded = False
+
+    def get(self):
+        # 別プロセスのCLIなどが書き込んでいたら読み直す
+        if self.db.is_changed_elsewhere() or not self.loaded:
+            self.load()
+        return self
+
+    def load(self):
+        self.table_names = {}
+        self.table_nos = {}
+        self.columns = {}
+        self.column_nos = {}
+        self.connections = {}
+        self.start_connections = {}
+        self.end_connections = {}
+        self.graph = None
+        self.generation += 1
+
+        for table_no, table_name in self.db.execute('SELECT table_no, table_name FROM table_list ORDER BY table_no').fetchall():
+            self.add_table(table_no, table_name)
+        sql = 'SELECT table_no, column_no, column, type, unique_flag FROM table_columns ORDER BY table_no, column_no'
+        for table_no, column_no, column, type, unique_flag in self.db.execute(sql).fetchall():
+            if table_no in self.columns:
+                self.columns[table_no][column_no] = [column, type, unique_flag]
+                self.column_nos[table_no][column] = column_no
+        sql = 'SELECT rowid, start_table_no, end_table_no, start_column_no, end_column_no, timeER, start_cardinality, end_cardinality FROM table_connection ORDER BY rowid'
+        for row in self.db.execute(sql).fetchall():
+            self.add_connection(row[0], list(row[1:]))
+        self.loaded = True
+
+    def add_table(self, table_no, table_name):
+        self.table_names[table_no] = table_name
+        self.table_nos[table_name] = table_no
+        self.columns[table_no] = {}
+        self.column_nos[table_no] = {}
+        self.start_connections[table_no] = []
+        self.end_connections[table_no] = []
+
+    def rename_table(self, table_no, table_name):
+        old_table_name = self.table_names[table_no]
+        if self.table_nos.get(old_table_name) == table_no:
+            del self.table_nos[old_table_name]
+        self.table_names[table_no] = table_name
+        self.table_nos[table_name] = table_no
+
+    def remove_table(self, table_no):
+        table_name = self.table_names.pop(table_no)
+        if self.table_nos.get(table_name) == table_no:
+            del self.table_nos[table_name]
+        for rowid in set(self.start_connections[table_no] + self.end_connections[table_no]):
+            self.remove_connection(rowid)
+        del self.columns[table_no]
+        del self.column_nos[table_no]
+        del self.start_connections[table_no]
+        del self.end_connections[table_no]
+
+    def set_column(self, table_no, column_no, column, type=None, unique_flag=None):
+        # 列ごとに索引を作り直すと列数の2乗になるので、変わった名前だけ付け替える
+        old = self.columns[table_no].get(column_no)
+        if old is not None and self.column_nos[table_no].get(old[0]) == column_no:
+            del self.column_nos[table_no][old[0]]
+        self.columns[table_no][column_no] = [column, type, unique_flag]
+        self.column_nos[table_no][column] = column_no
+
+    def remove_column(self, table_no, column_no):
+        column = self.columns[table_no].pop(column_no)[0]
+        if self.column_nos[table_no].get(column) == column_no:
+            del self.column_nos[table_no][column]
+
+    def add_connection(self, rowid, connection):
+        self.connections[rowid] = connection
+        self.start_connections.setdefault(connection[0], []).append(rowid)
+        self.end_connections.setdefault(connection[1], []).append(rowid)
+        if self.graph is not None:
+            self.graph.add(rowid, connection[0], connection[1])
+
+    def remove_connection(self, rowid):
+        connection = self.connections.pop(rowid)
+        self.start_connections[connection[0]].remove(rowid)
+        self.end_connections[connection[1]].remove(rowid)
+        if self.graph is not None:
+            self.graph.remove(rowid)
+
+    def get_graph(self):
+        # 経路探索を使うときに作り、以降は接続の追加・削除に合わせて更新する
+        if self.graph is None or self.graph.stale:
+            self.graph = JoinGraph(self.connections)
+        return self.graph
+
+db = Database(db_path)
+catalog = Catalog(db)
+
+TableAdded = collections.namedtuple('TableAdded', ['table_no', 'table_name'])
+TableRenamed = collections.namedtuple('TableRenamed', ['table_no', 'old_table_name', 'table_name'])
+TableDeleted = collections.namedtuple('TableDeleted', ['table_no', 'table_name'])
+ColumnsChanged = collections.namedtuple('ColumnsChanged', ['table_no', 'table_name'])
+ConnectionAdded = collections.namedtuple('ConnectionAdded', ['rowid', 'start_table_no', 'end_table_no'])
+ConnectionRemoved = collections.namedtuple('ConnectionRemoved', ['rowid', 'start_table_no', 'end_table_no'])
+ConnectionChanged = collections.namedtuple('ConnectionChanged', ['rowid', 'start_table_no', 'end_table_no'])
+
+def add_change_listener(listener):
+    db.change_listeners.append(listener)
+
+def get_catalog_generation():
+    return catalog.get().generation
+
+def migrate_create_tables(cur):
+    sql = """CREATE TABLE IF NOT EXISTS table_list (
+    table_no INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL
+    )"""
+    cur.execute(sql)
+
+    sql = """CREATE TABLE IF NOT EXISTS table_columns (
+    table_no INTEGER NOT NULL,
+    column_no INTEGER NOT NULL,
+    column TEXT NOT NULL,
+    type TEXT,
+    unique_flag TEXT
+    )"""
+    cur.execute(sql)
+
+    sql = """CREATE TABLE IF NOT EXISTS table_connection (
+    start_table_no INTEGER NOT NULL,
+    end_table_no INTEGER NOT NULL,
+    start_column_no INTEGER NOT NULL,
+    end_column_no INTEGER NOT NULL,
+    timeER TEXT,
+    start_cardinality TEXT,
+    end_cardinality TEXT
+    )"""
+    cur.execute(sql)
+
+def migrate_add_indexes(cur):
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_table_list_name ON table_list (table_name)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_table_columns_no ON table_columns (table_no, column_no)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_table_columns_name ON table_columns (table_no, column)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_table_connection_start ON table_connection (start_table_no)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_table_connection_end ON table_connection (end_table_no)')
+
+# スキーマ変更は末尾に追加していく（PRAGMA user_version = 適用済みの数）
+def migrate_add_sketches(cur):
+    sql = """CREATE TABLE IF NOT EXISTS table_source (
+    table_no INTEGER PRIMARY KEY,
+    path TEXT NOT NULL
+    )"""
+    cur.execute(sql)
+
+    sql = """CREATE TABLE IF NOT EXISTS column_sketch (
+    table_no INTEGER NOT NULL,
+    column_no INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    distinct_count REAL NOT NULL,
+    signature BLOB NOT NULL,
+    PRIMARY KEY (table_no, column_no)
+    )"""
+    cur.execute(sql)
+
+def migrate_add_key_state(cur):
+    sql = """CREATE TABLE IF NOT EXISTS key_state (
+    table_no INTEGER NOT NULL,
+    column_nos TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    is_unique INTEGER NOT NULL,
+    PRIMARY KEY (table_no, column_nos)
+    )"""
+    cur.execute(sql)
+
+def migrate_add_layout(cur):
+    sql = """CREATE TABLE IF NOT EXISTS table_layout (
+    table_no INTEGER PRIMARY KEY,
+    x REAL NOT NULL,
+    y REAL NOT NULL
+    )"""
+    cur.execute(sql)
+
+def migrate_add_name_search(cur):
+    # 2文字ずつの組を単語として索引する（日本語の短い語でも部分一致で引ける）
+    sql = """CREATE VIRTUAL TABLE IF NOT EXISTS name_search USING fts5(grams, prefix='6')"""
+    cur.execute(sql)
+
+    rows = [(name_rowid(table_no), name_grams(table_name)) for table_no, table_name in cur.execute('SELECT table_no, table_name FROM table_list').fetchall()]
+    rows += [(name_rowid(table_no, column_no), name_grams(column)) for table_no, column_no, column in cur.execute('SELECT table_no, column_no, column FROM table_columns').fetchall()]
+    sql = """INSERT INTO name_search (rowid, grams) VALUES (?, ?)"""
+    cur.executemany(sql, rows)
+
+def migrate_add_schema_source(cur):
+    # SQLiteファイルから取り込んだテーブルの取り込み元と、そのときの定義
+    sql = """CREATE TABLE IF NOT EXISTS schema_source (
+    table_no INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    definition TEXT NOT NULL
+    )"""
+    cur.execute(sql)
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_schema_source_path ON schema_source (path)')
+
+def migrate_add_schema_source_name(cur):
+    # 取り込み後にテーブル名を変えても同じテーブルとして扱えるよう、取り込み元での名前を持つ
+    cur.execute('ALTER TABLE schema_source ADD COLUMN source_name TEXT')
+    cur.execute('UPDATE schema_source SET source_name = (SELECT table_name FROM table_list WHERE table_list.table_no = schema_source.table_no)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_schema_source_name ON schema_source (path, source_name)')
+
+migrations = [
+    migrate_create_tables,
+    migrate_add_indexes,
+    migrate_add_sketches,
+    migrate_add_key_state,
+    migrate_add_layout,
+    migrate_add_name_search,
+    migrate_add_schema_source,
+    migrate_add_schema_source_name,
+]
+
+def normalize_name(name):
+    # 全角・半角や大文字・小文字の違いを吸収して比べる
+    return unicodedata.normalize('NFKC', name).casefold()
+
+def gram_token(gram):
+    # FTS5の区切り文字に左右されないよう、1文字を16進6桁にして1語にする
+    return ''.join(f'{ord(c):06x}' for c in gram)
+
+def name_grams(name):
+    # 前後に\0を付けて、先頭・末尾の1文字も2文字の組に入るようにする
+    text = '\0' + normalize_name(name) + '\0'
+    return ' '.join(gram_token(text[i:i+2]) for i in range(len(text)-1))
+
+def name_rowid(table_no, column_no=None):
+    # 検索索引の行番号：上位にテーブル番号、下位20ビットにテーブル名なら0、列名なら列番号+1
+    return (table_no << 20) | (0 if column_no is None else column_no + 1)
+
+def init_table():
+    with db.transaction() as cur:
+        version = cur.execute('PRAGMA user_version').fetchone()[0]
+        for i in range(version, len(migrations)):
+            migrations[i](cur)
+            cur.execute(f'PRAGMA user_version = {i+1}')
+
+def insert_table(table_name, columns):
+    insert_tables([(table_name, columns)])
+
+def insert_tables(tables):
+    with db.transaction() as cur:
+        cat = catalog.get()
+        # 番号を先に決めてまとめて登録する
+        table_no = cur.execute("SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name='table_list'), 0), IFNULL((SELECT MAX(table_no) FROM table_list), 0))").fetchone()[0]
+        table_rows = []
+        column_rows = []
+        for table_name, columns in tables:
+            table_no += 1
+            table_rows.append((table_no, table_name))
+            column_rows += [(table_no, i, col) for i, col in enumerate(columns)]
+
+        sql = """INSERT INTO table_list (table_no,table_name) VALUES (?, ?)"""
+        cur.executemany(sql, table_rows)
+        sql = """INSERT INTO table_columns (table_no,column_no,column) VALUES (?, ?, ?)"""
+        cur.executemany(sql, column_rows)
+        sql = """INSERT INTO name_search (rowid, grams) VALUES (?, ?)"""
+        cur.executemany(sql, [(name_rowid(table_no), name_grams(table_name)) for table_no, table_name in table_rows])
+        cur.executemany(sql, [(name_rowid(table_no, i), name_grams(col)) for table_no, i, col in column_rows])
+
+        for table_no, table_name in table_rows:
+            cat.add_table(table_no, table_name)
+        for table_no, i, col in column_rows:
+            cat.set_column(table_no, i, col)
+        for table_no, table_name in table_rows:
+            db.emit(TableAdded(table_no, table_name))
+
+def read_csv_header(filename):
+    # BOM付き・クォート付きのヘッダーにも対応する
+    with open(filename, 'r', encoding='utf-8-sig', newline='') as fp:
+        return next(csv.reader(fp), [])
+
+def find_csv_files(directory):
+    filenames = []
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            if file.lower().endswith('.csv'):
+                filenames.append(os.path.join(root, file))
+    return sorted(filenames)
+
+int_pattern = re.compile(r'[-+]?\d+$')
+float_pattern = re.compile(r'[-+]?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?$')
+date_pattern = re.compile(r'\d{4}[-/]\d{1,2}[-/]\d{1,2}([ T]\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?)?$')
+
+def infer_type(value):
+    if int_pattern.match(value):
+        return 'int'
+    if float_pattern.match(value):
+        return 'float'
+    if date_pattern.match(value):
+        return 'date'
+    return 'text'
+
+def merge_type(type1, type2):
+    if type1 is None or type1 == type2:
+        return type2
+    if type2 is None:
+        return type1
+    if type1 in ('int', 'float') and type2 in ('int', 'float'):
+        return 'float'
+    return 'text'
+
+def value_hash(value):
+    # プロセス間で同じ値になるようにhash()ではなくblake2bを使う
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class HyperLogLog():
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = bytearray(1 << p)
+
+    def add(self, h):
+        index = h >> (64 - self.p)
+        w = h & ((1 << (64 - self.p)) - 1)
+        rank = 64 - self.p - w.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+        return estimate
+
+class HashBudget():
+    # 同じファイルの列どうしで、正確に持つハッシュ数の上限を分け合う
+    def __init__(self, limit=None):
+        self.limit = unique_hash_limit if limit is None else limit
+        self.used = 0
+
+class ColumnProfile():
+    def __init__(self, budget=None):
+        self.type = None
+        self.count = 0
+        self.hashes = set()
+        self.sketch = None
+        self.duplicated = False
+        self.budget = HashBudget() if budget is None else budget
+
+    def add(self, value):
+        # 空文字はNULL扱いで型・一意性の判定から外す
+        if value == '':
+            return
+        self.count += 1
+        if self.type != 'text':
+            self.type = merge_type(self.type, infer_type(value))
+        if not self.duplicated:
+            self.add_hash(value_hash(value))
+
+    def add_hash(self, h):
+        if self.sketch is not None:
+            self.sketch.add(h)
+        elif h in self.hashes:
+            self.set_duplicated()
+        else:
+            self.hashes.add(h)
+            self.budget.used += 1
+            # 全列の合計が上限を超えたら、今増えた列から推定に切り替えてハッシュを手放す
+            if self.budget.used > self.budget.limit:
+                self.to_sketch()
+
+    def set_duplicated(self):
+        self.duplicated = True
+        self.budget.used -= len(self.hashes)
+        self.hashes = set()
+        self.sketch = None
+
+    def to_sketch(self):
+        self.sketch = HyperLogLog()
+        for h in self.hashes:
+            self.sketch.add(h)
+        self.budget.used -= len(self.hashes)
+        self.hashes = set()
+
+    def merge(self, other):
+        self.count += other.count
+        self.type = merge_type(self.type, other.type)
+        if self.duplicated or other.duplicated:
+            self.set_duplicated()
+        elif other.sketch is not None:
+            if self.sketch is None:
+                self.to_sketch()
+            self.sketch.merge(other.sketch)
+        else:
+            for h in other.hashes:
+                self.add_hash(h)
+                if self.duplicated:
+                    break
+
+    def is_unique(self):
+        if self.count == 0 or self.duplicated:
+            return False
+        if self.sketch is None:
+            return True
+        # 推定値なので誤差の範囲内なら一意とみなす
+        return self.sketch.count() >= self.count * 0.98
+
+def profile_rows(rows, column_count):
+    budget = HashBudget()
+    profiles = [ColumnProfile(budget) for _ in range(column_count)]
+    for row in rows:
+        for profile, value in zip(profiles, row):
+            profile.add(value)
+    return profiles
+
+def create_process_pool(workers=None):
+    # コマンドラインの起動を軽くするため、プロセスプールを使うときだけ読み込む
+    import multiprocessing
+
+    # Tkを抱えたプロセスからforkしないようにspawnで起動する
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+def profile_csv(filename, executor=None, cancel_event=None):
+    # 行を一定件数ずつ読み、同時に処理中のチャンク数を抑えてメモリを一定に保つ
+    max_pending = (os.cpu_count() or 1) * 2
+    with open(filename, 'r', encoding='utf-8-sig', newline='') as fp:
+        reader = csv.reader(fp)
+        columns = next(reader, [])
+        budget = HashBudget()
+        profiles = [ColumnProfile(budget) for _ in columns]
+        pending = set()
+
+        def merge_profiles(chunk_profiles):
+            for profile, chunk_profile in zip(profiles, chunk_profiles):
+                profile.merge(chunk_profile)
+
+        for rows in iter(lambda: list(itertools.islice(reader, profile_chunk_rows)), []):
+            # 中止されたら未着手のチャンクを取り消して結果を返さない
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                return None
+            if executor is None:
+                merge_profiles(profile_rows(rows, len(columns)))
+                continue
+            pending.add(executor.submit(profile_rows, rows, len(columns)))
+            if len(pending) >= max_pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    merge_profiles(future.result())
+        for future in pending:
+            merge_profiles(future.result())
+    return columns, profiles
+
+def profile_csv_file(filename, workers=None, cancel_event=None):
+    with create_process_pool(workers) as executor:
+        return profile_csv(filename, executor, cancel_event)
+
+def update_column_profiles(table_name, columns, profiles):
+    with db.transaction() as cur:
+        cat = catalog.get()
+        table_no = get_table_no(table_name)
+        if table_no is None:
+            return
+        # 登録時に列を消したり名前を変えたりできるので、CSVのヘッダーの列名で対応づける
+        column_profiles = dict(zip(columns, profiles))
+        for column_no, (column, _, _) in list(cat.columns[table_no].items()):
+            profile = column_profiles.get(column)
+            if profile is None:
+                continue
+            unique_flag = '1' if profile.is_unique() else '0'
+            sql = """UPDATE table_columns SET type=?, unique_flag=? WHERE table_no=? and column_no=?"""
+            cur.execute(sql, [profile.type, unique_flag, table_no, column_no])
+            cat.set_column(table_no, column_no, column, profile.type, unique_flag)
+        db.emit(ColumnsChanged(table_no, table_name))
+
+def import_csv_dir(directory, workers=None, profile=False):
+    start_time = time.perf_counter()
+    filenames = find_csv_files(directory)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(read_csv_header, filename) for filename in filenames]
+
+    table_list = set(get_tables())
+    tables = []
+    imported = []
+    skipped = []
+    for filename, future in zip(filenames, futures):
+        # 読めないファイルがあってもそのファイルだけ飛ばして続ける
+        try:
+            columns = future.result()
+        except (UnicodeDecodeError, OSError, csv.Error) as e:
+            skipped.append((filename, str(e)))
+            continue
+        table_name = os.path.splitext(os.path.basename(filename))[0]
+        if table_name in table_list:
+            skipped.append((filename, f'テーブル名が重複しています: {table_name}'))
+            continue
+        if len(columns) <= 0:
+            skipped.append((filename, '列がありません'))
+            continue
+        table_list.add(table_name)
+        tables.append((table_name, columns))
+        imported.append(filename)
+    with db.transaction():
+        insert_tables(tables)
+        for filename, (table_name, _) in zip(imported, tables):
+            set_table_source(table_name, filename)
+
+    if profile:
+        # 推定には時間がかかるので、書き込みロックを持たずに読み、結果だけファイルごとに短く書き込む
+        with create_process_pool(workers) as executor:
+            for filename, (table_name, _) in zip(imported, tables):
+                try:
+                    columns, profiles = profile_csv(filename, executor)
+                except (UnicodeDecodeError, OSError, csv.Error) as e:
+                    skipped.append((filename, f'型の推定に失敗しました: {e}'))
+                    continue
+                update_column_profiles(table_name, columns, profiles)
+
+    return len(tables), skipped, time.perf_counter() - start_time
+
+def set_table_source(table_name, filename):
+    with db.transaction() as cur:
+        sql = """INSERT OR REPLACE INTO table_source (table_no, path) VALUES (?, ?)"""
+        cur.execute(sql, [get_table_no(table_name), os.path.abspath(filename)])
+
+def read_sqlite_schema(filename):
+    # 取り込み元のファイルを書き換えないよう、読み取り専用で開く
+    path = os.path.abspath(filename).replace('%', '%25').replace('?', '%3f').replace('#', '%23')
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        # テーブルごとにPRAGMAを呼ばず、表値関数を結合してファイルごとに種類ごと1回で読む
+        # 仮想テーブル（FTS5など）とその裏のシャドウテーブルは取り込まない
+        if sqlite3.sqlite_version_info >= (3, 37, 0):
+            tables = "SELECT name FROM pragma_table_list WHERE schema='main' AND type='table' AND name NOT LIKE 'sqlite!_%' ESCAPE '!'"
+        else:
+            # pragma_table_listがない古いSQLiteでは、仮想テーブル名_で始まるテーブルをシャドウテーブルとみなす
+            tables = """SELECT name FROM sqlite_master m WHERE type='table' AND name NOT LIKE 'sqlite!_%' ESCAPE '!'
+            AND sql NOT LIKE 'CREATE VIRTUAL TABLE%'
+            AND NOT EXISTS (SELECT 1 FROM sqlite_master v WHERE v.type='table' AND v.sql LIKE 'CREATE VIRTUAL TABLE%' AND substr(m.name, 1, length(v.name) + 1) = v.name || '_')"""
+        schema = {}
+        sql = f"""SELECT m.name, p.name, p.type, p.pk FROM ({tables}) m JOIN pragma_table_info(m.name) p ORDER BY m.name, p.cid"""
+        for table_name, column, type, pk in conn.execute(sql).fetchall():
+            table = schema.setdefault(table_name, {'columns': [], 'foreign_keys': [], 'primary_keys': []})
+            table['columns'].append([column, type or None, '0'])
+            if pk > 0:
+                table['primary_keys'].append((pk, column))
+
+        # 1列だけの主キー・ユニーク索引がある列をユニークとみなす
+        unique_columns = collections.defaultdict(set)
+        for table_name, table in schema.items():
+            table['primary_keys'] = [column for _, column in sorted(table['primary_keys'])]
+            if len(table['primary_keys']) == 1:
+                unique_columns[table_name].add(table['primary_keys'][0])
+        sql = f"""SELECT m.name, MIN(i.name) FROM ({tables}) m JOIN pragma_index_list(m.name) l JOIN pragma_index_info(l.name) i
+        WHERE l."unique" = 1 AND l.partial = 0 GROUP BY m.name, l.name HAVING COUNT(*) = 1"""
+        for table_name, column in conn.execute(sql).fetchall():
+            if column is not None:
+                unique_columns[table_name].add(column)
+        for table_name, columns in unique_columns.items():
+            for col in schema[table_name]['columns']:
+                if col[0] in columns:
+                    col[2] = '1'
+
+        sql = f"""SELECT m.name, f.id, f."table", f."from", f."to" FROM ({tables}) m JOIN pragma_foreign_key_list(m.name) f ORDER BY m.name, f.id, f.seq"""
+        foreign_keys = {}
+        for table_name, fk_id, parent_table, from_column, to_column in conn.execute(sql).fetchall():
+            if (table_name, fk_id) not in foreign_keys:
+                foreign_keys[(table_name, fk_id)] = [parent_table, []]
+                schema[table_name]['foreign_keys'].append(foreign_keys[(table_name, fk_id)])
+            foreign_keys[(table_name, fk_id)][1].append([from_column, to_column])
+    finally:
+        conn.close()
+
+    # 参照先の列を省略した外部キーは参照先テーブルの主キーを指す
+    for table in schema.values():
+        for parent_table, keys in table['foreign_keys']:
+            parent_keys = schema.get(parent_table, {}).get('primary_keys', [])
+            for i, key in enumerate(keys):
+                if key[1] is None and i < len(parent_keys):
+                    key[1] = parent_keys[i]
+            keys[:] = [key for key in keys if key[1] is not None]
+    for table in schema.values():
+        del table['primary_keys']
+    return schema
+
+def sync_table_columns(cur, table_no, columns):
+    # 列名で対応づけ、既存の列番号（とそれを使う接続）を残したまま型・ユニークを更新する
+    cat = catalog.get()
+    column_nos = dict(cat.column_nos[table_no])
+    next_column_no = max(cat.columns[table_no], default=-1) + 1
+    names = set()
+    for column, type, unique_flag in columns:
+        names.add(column)
+        if column in column_nos:
+            sql = """UPDATE table_columns SET type=?, unique_flag=? WHERE table_no=? and column_no=?"""
+            cur.execute(sql, [type, unique_flag, table_no, column_nos[column]])
+            cat.set_column(table_no, column_nos[column], column, type, unique_flag)
+            continue
+        sql = """INSERT INTO table_columns (table_no,column_no,column,type,unique_flag) VALUES (?, ?, ?, ?, ?)"""
+        cur.execute(sql, [table_no, next_column_no, column, type, unique_flag])
+        sql = """INSERT INTO name_search (rowid, grams) VALUES (?, ?)"""
+        cur.execute(sql, [name_rowid(table_no, next_column_no), name_grams(column)])
+        cat.set_column(table_no, next_column_no, column, type, unique_flag)
+        next_column_no += 1
+
+    for column, column_no in column_nos.items():
+        if column in names:
+            continue
+        # なくなった列と、その列を使っていた接続を消す
+        for rowid in sorted(set(cat.start_connections[table_no] + cat.end_connections[table_no])):
+            connection = cat.connections[rowid]
+            if (connection[0] == table_no and connection[2] == column_no) or (connection[1] == table_no and connection[3] == column_no):
+                cur.execute('DELETE FROM table_connection WHERE rowid=?', [rowid])
+                cat.remove_connection(rowid)
+                db.emit(ConnectionRemoved(rowid, connection[0], connection[1]))
+        sql = """DELETE FROM table_columns WHERE table_no=? and column_no=?"""
+        cur.execute(sql, [table_no, column_no])
+        sql = """DELETE FROM column_sketch WHERE table_no=? and column_no=?"""
+        cur.execute(sql, [table_no, column_no])
+        sql = """DELETE FROM name_search WHERE rowid=?"""
+        cur.execute(sql, [name_rowid(table_no, column_no)])
+        cat.remove_column(table_no, column_no)
+
+def sync_foreign_keys(cur, table_no, old_foreign_keys, foreign_keys, parent_nos):
+    # 前回の定義から消えた外部キーの接続を外し、足りない接続だけを追加する
+    # 参照先は取り込み元での名前で書かれているので、parent_nosでテーブル番号に直す
+    cat = catalog.get()
+    existing = {}
+    for rowid in cat.start_connections[table_no]:
+        connection = cat.connections[rowid]
+        existing.setdefault((connection[1], connection[2], connection[3]), rowid)
+
+    def get_key(parent_table, from_column, to_column):
+        parent_no = parent_nos(parent_table)
+        return (parent_no, cat.column_nos[table_no].get(from_column), cat.column_nos.get(parent_no, {}).get(to_column))
+
+    wanted = set()
+    for parent_table, keys in foreign_keys:
+        for from_column, to_column in keys:
+            wanted.add((parent_table, from_column, to_column))
+    for parent_table, keys in old_foreign_keys:
+        for from_column, to_column in keys:
+            key = get_key(parent_table, from_column, to_column)
+            if (parent_table, from_column, to_column) in wanted or key not in existing:
+                continue
+            rowid = existing.pop(key)
+            cur.execute('DELETE FROM table_connection WHERE rowid=?', [rowid])
+            cat.remove_connection(rowid)
+            db.emit(ConnectionRemoved(rowid, table_no, key[0]))
+
+    for parent_table, keys in foreign_keys:
+        columns = []
+        parent_no = parent_nos(parent_table)
+        for from_column, to_column in keys:
+            key = get_key(parent_table, from_column, to_column)
+            if None in key or key in existing:
+                continue
+            columns.append([from_column, to_column])
+        if len(columns) > 0:
+            insert_connection(cat.table_names[table_no], cat.table_names[parent_no], columns, [None] * len(columns))
+
+def import_sqlite_files(filenames, workers=None):
+    start_time = time.perf_counter()
+    # スキーマの読み出しはファイルごとに並列で行い、登録は1トランザクションにまとめる
+    paths = list(dict.fromkeys(os.path.abspath(filename) for filename in filenames))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(read_sqlite_schema, path) for path in paths]
+    schemas = []
+    skipped = []
+    for path, future in zip(paths, futures):
+        try:
+            schemas.append((path, future.result()))
+        except sqlite3.Error as e:
+            skipped.append((path, str(e)))
+
+    counts = collections.Counter()
+    with db.transaction() as cur:
+        cat = catalog.get()
+        # 取り込み後に名前を変えられても追えるよう、(ファイル, 取り込み元での名前)でテーブル番号を引く
+        sources = collections.defaultdict(dict)
+        definitions = {}
+        for table_no, path, source_name, definition in cur.execute('SELECT table_no, path, source_name, definition FROM schema_source').fetchall():
+            sources[path][source_name] = table_no
+            definitions[table_no] = json.loads(definition)
+
+        new_tables = []
+        changed = []
+        imported = []
+        table_names = set()
+        for path, schema in schemas:
+            for source_name, table_no in list(sources[path].items()):
+                if source_name not in schema:
+                    # 取り込み元からなくなったテーブル
+                    delete_table(cat.table_names[table_no])
+                    del sources[path][source_name]
+                    counts['deleted'] += 1
+            for source_name, definition in schema.items():
+                table_no = sources[path].get(source_name)
+                if table_no is None:
+                    # 手で登録したテーブルや別ファイルのテーブルとは名前が重なるので上書きしない
+                    if source_name in table_names or get_table_no(source_name) is not None:
+                        skipped.append((path, f'テーブル名が重複しています: {source_name}'))
+                        continue
+                    table_names.add(source_name)
+                    new_tables.append((path, source_name, definition))
+                elif definitions[table_no] != definition:
+                    changed.append((path, source_name, definition))
+                else:
+                    counts['unchanged'] += 1
+                imported.append((path, source_name, definition))
+
+        insert_tables([(source_name, [column for column, _, _ in definition['columns']]) for _, source_name, definition in new_tables])
+        for path, source_name, definition in new_tables:
+            table_no = get_table_no(source_name)
+            sources[path][source_name] = table_no
+            sql = """UPDATE table_columns SET type=?, unique_flag=? WHERE table_no=? and column_no=?"""
+            cur.executemany(sql, [(type, unique_flag, table_no, i) for i, (_, type, unique_flag) in enumerate(definition['columns'])])
+            for i, (column, type, unique_flag) in enumerate(definition['columns']):
+                cat.set_column(table_no, i, column, type, unique_flag)
+            sql = """INSERT OR REPLACE INTO schema_source (table_no, path, source_name, definition) VALUES (?, ?, ?, ?)"""
+            cur.execute(sql, [table_no, path, source_name, json.dumps(definition, ensure_ascii=False)])
+            counts['added'] += 1
+        for path, source_name, definition in changed:
+            table_no = sources[path][source_name]
+            sync_table_columns(cur, table_no, definition['columns'])
+            sql = """INSERT OR REPLACE INTO schema_source (table_no, path, source_name, definition) VALUES (?, ?, ?, ?)"""
+            cur.execute(sql, [table_no, path, source_name, json.dumps(definition, ensure_ascii=False)])
+            db.emit(ColumnsChanged(table_no, cat.table_names[table_no]))
+            counts['changed'] += 1
+
+        # 参照先が後から取り込まれた場合に備え、変更のないテーブルの外部キーも確かめる
+        # 同じファイルの参照先は取り込み元での名前で、別ファイルのテーブルは今の名前で探す
+        for path, source_name, definition in imported:
+            table_no = sources[path][source_name]
+            old_definition = definitions.get(table_no, {'foreign_keys': []})
+            parent_nos = lambda parent_table, path=path: sources[path].get(parent_table, get_table_no(parent_table))
+            sync_foreign_keys(cur, table_no, old_definition['foreign_keys'], definition['foreign_keys'], parent_nos)
+
+    return counts, skipped, time.perf_counter() - start_time
+
+class ColumnSketch():
+    def __init__(self):
+        self.signature = [(1 << 64) - 1] * minhash_bins
+        self.hll = HyperLogLog(10)
+
+    def add(self, value):
+        if value == '':
+            return
+        h = value_hash(value)
+        self.hll.add(h)
+        # 上位ビットでビンを選び、残りのビットの最小値を保持する
+        shift = 64 - (minhash_bins.bit_length() - 1)
+        b = h >> shift
+        v = h & ((1 << shift) - 1)
+        if v < self.signature[b]:
+            self.signature[b] = v
+
+def sketch_csv(filename):
+    with open(filename, 'r', encoding='utf-8-sig', newline='') as fp:
+        reader = csv.reader(fp)
+        columns = next(reader, [])
+        sketches = [ColumnSketch() for _ in columns]
+        for row in reader:
+            for sketch, value in zip(sketches, row):
+                sketch.add(value)
+    return columns, [(array.array('Q', sketch.signature).tobytes(), sketch.hll.count()) for sketch in sketches]
+
+def refresh_column_sketches(workers=None):
+    # ファイルの更新日時とサイズが変わったテーブルだけスケッチを作り直す
+    sql = """SELECT s.table_no, s.path, MIN(k.mtime), MIN(k.size), COUNT(k.column_no)
+    FROM table_source s LEFT JOIN column_sketch k ON k.table_no = s.table_no
+    GROUP BY s.table_no"""
+    stale = []
+    for table_no, path, mtime, size, sketch_num in db.execute(sql).fetchall():
+        if not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        if sketch_num == 0 or mtime != stat.st_mtime or size != stat.st_size:
+            stale.append((table_no, path, stat))
+    if len(stale) == 0:
+        return 0
+
+    with create_process_pool(workers) as executor:
+        results = list(executor.map(sketch_csv, [path for _, path, _ in stale]))
+
+    with db.transaction() as cur:
+        cat = catalog.get()
+        for (table_no, _, stat), (columns, sketches) in zip(stale, results):
+            cur.execute('DELETE FROM column_sketch WHERE table_no=?', [table_no])
+            # CSVのヘッダーの列名で列番号を引き、テーブルにない列は捨てる
+            column_nos = cat.column_nos.get(table_no, {})
+            rows = [(table_no, column_nos[column], stat.st_mtime, stat.st_size, distinct_count, signature) for column, (signature, distinct_count) in zip(columns, sketches) if column in column_nos]
+            sql = """INSERT INTO column_sketch (table_no, column_no, mtime, size, distinct_count, signature) VALUES (?, ?, ?, ?, ?, ?)"""
+            cur.executemany(sql, rows)
+    return len(stale)
+
+def estimate_containment(signature1, signature2):
+    # ビンごとの最小値が列1側にあるビンのうち、列2と一致した割合で包含率 |A∩B|/|A| を推定する
+    empty = (1 << 64) - 1
+    match = 0
+    total = 0
+    for v1, v2 in zip(signature1, signature2):
+        if v1 == empty or v1 > v2:
+            continue
+        total += 1
+        if v1 == v2:
+            match += 1
+    if total == 0:
+        return 0.0
+    return match / total
+
+def discover_connections(workers=None, min_containment=0.8, min_distinct=10):
+    refresh_column_sketches(workers)
+    cat = catalog.get()
+
+    sketches = {}
+    sql = 'SELECT table_no, column_no, distinct_count, signature FROM column_sketch'
+    for table_no, column_no, distinct_count, signature in db.execute(sql).fetchall():
+        if table_no in cat.columns and column_no in cat.columns[table_no] and distinct_count >= min_distinct:
+            sketches[(table_no, column_no)] = (array.array('Q', signature), distinct_count)
+
+    # LSH: 同じビンで同じ最小値を持つ列どうしだけを候補にする
+    # 包含関係は小さい列と大きい列のJaccard係数が低いので複数ビンのバンドにはせず、
+    # 連番のキー列どうしのように多くの列が同じ最小値を持つ大きすぎるバケツを飛ばして総当たりにならないようにする
+    buckets = {}
+    empty = (1 << 64) - 1
+    for key, (signature, _) in sketches.items():
+        for b, v in enumerate(signature):
+            if v != empty:
+                buckets.setdefault((b, v), []).append(key)
+    pairs = set()
+    for keys in buckets.values():
+        if len(keys) > lsh_bucket_limit:
+            continue
+        for i in range(len(keys)):
+            for j in range(i+1, len(keys)):
+                if keys[i][0] != keys[j][0]:
+                    pairs.add((keys[i], keys[j]) if keys[i] < keys[j] else (keys[j], keys[i]))
+
+    connected = set()
+    for connection in cat.connections.values():
+        connected.add(((connection[0], connection[2]), (connection[1], connection[3])))
+        connected.add(((connection[1], connection[3]), (connection[0], connection[2])))
+
+    candidates = []
+    for key1, key2 in sorted(pairs):
+        if (key1, key2) in connected:
+            continue
+        signature1, signature2 = sketches[key1][0], sketches[key2][0]
+        # 包含される側を開始（n側）、包含する側を終了（1側）とする
+        # 親のキーをすべて参照する外部キーは両向きとも包含率が1になるので、向きごとに終了側がユニークかも見て選ぶ
+        orientations = []
+        for start, end, signature_start, signature_end in ((key1, key2, signature1, signature2), (key2, key1, signature2, signature1)):
+            containment = estimate_containment(signature_start, signature_end)
+            if containment >= min_containment and cat.columns[end[0]][end[1]][2] != '0':
+                orientations.append((containment, cat.columns[end[0]][end[1]][2] == '1', start, end))
+        if len(orientations) == 0:
+            continue
+        containment, _, start, end = max(orientations, key=lambda orientation: orientation[:2])
+        candidates.append([cat.table_names[start[0]], cat.table_names[end[0]], cat.columns[start[0]][start[1]][0], cat.columns[end[0]][end[1]][0], containment])
+    return candidates
+
+class UniqueKeyChecker():
+    def __init__(self):
+        self.seen = set()
+        self.partitions = None
+        self.buffers = None
+        self.duplicated = False
+
+    def add(self, h):
+        if self.duplicated:
+            return
+        if self.partitions is not None:
+            self.add_partition(h)
+        elif h in self.seen:
+            self.duplicated = True
+            self.seen = set()
+        else:
+            self.seen.add(h)
+            if len(self.seen) > key_memory_limit:
+                self.spill()
+
+    def spill(self):
+        import tempfile
+
+        # ハッシュ値で分割して一時ファイルに書き出し、後で分割ごとに重複を調べる
+        self.partitions = [tempfile.TemporaryFile() for _ in range(spill_partitions)]
+        self.buffers = [array.array('Q') for _ in range(spill_partitions)]
+        for h in self.seen:
+            self.add_partition(h)
+        self.seen = set()
+
+    def add_partition(self, h):
+        buffer = self.buffers[h % spill_partitions]
+        buffer.append(h)
+        if len(buffer) >= 65536:
+            self.flush(h % spill_partitions)
+
+    def flush(self, i):
+        self.buffers[i].tofile(self.partitions[i])
+        self.buffers[i] = array.array('Q')
+
+    def is_unique(self):
+        if self.duplicated:
+            return False
+        if self.partitions is None:
+            return True
+        try:
+            for i, partition in enumerate(self.partitions):
+                self.flush(i)
+                partition.seek(0)
+                hashes = array.array('Q', partition.read())
+                if len(set(hashes)) < len(hashes):
+                    return False
+            return True
+        finally:
+            for partition in self.partitions:
+                partition.close()
+
+def check_unique_keys(filename, keys):
+    # keys: 列名のタプルのリスト。複合キーは値を連結して1つのキーとして数える
+    with open(filename, 'r', encoding='utf-8-sig', newline='') as fp:
+        reader = csv.reader(fp)
+        header = {column: i for i, column in enumerate(next(reader, []))}
+        # ヘッダーにない列を含むキーは判定できないのでNoneを返す
+        positions = [[header.get(column) for column in key] for key in keys]
+        checkers = [None if None in key else UniqueKeyChecker() for key in positions]
+        for row in reader:
+            for checker, key in zip(checkers, positions):
+                if checker is None:
+                    continue
+                values = [row[i] if i < len(row) else '' for i in key]
+                if '' in values:
+                    continue
+                checker.add(value_hash('\x1f'.join(values)))
+    return [None if checker is None else checker.is_unique() for checker in checkers]
+
+def update_cardinalities(workers=None):
+    cat = catalog.get()
+    # 開始・終了テーブルの組ごとにキー列をまとめる
+    pairs = {}
+    for rowid, connection in cat.connections.items():
+        if connection[2] is None or connection[3] is None:
+            continue
+        start_cols, end_cols, rowids = pairs.setdefault((connection[0], connection[1]), (set(), set(), []))
+        start_cols.add(connection[2])
+        end_cols.add(connection[3])
+        rowids.append(rowid)
+    keys = set()
+    for (start_table_no, end_table_no), (start_cols, end_cols, _) in pairs.items():
+        keys.add((start_table_no, tuple(sorted(start_cols))))
+        keys.add((end_table_no, tuple(sorted(end_cols))))
+
+    sources = dict(db.execute('SELECT table_no, path FROM table_source').fetchall())
+    states = {}
+    for table_no, column_nos, mtime, size, is_unique in db.execute('SELECT table_no, column_nos, mtime, size, is_unique FROM key_state').fetchall():
+        states[(table_no, tuple(int(no) for no in column_nos.split(',')))] = (mtime, size, bool(is_unique))
+
+    # ソースファイルが変わったキーだけ読み直す
+    stale = {}
+    stats = {}
+    for table_no, key in keys:
+        path = sources.get(table_no)
+        if path is None or not os.path.exists(path):
+            continue
+        stat = os.stat(path)
+        stats[table_no] = stat
+        state = states.get((table_no, key))
+        if state is None or state[0] != stat.st_mtime or state[1] != stat.st_size:
+            stale.setdefault(table_no, []).append(key)
+
+    if len(stale) > 0:
+        table_nos = list(stale)
+        with create_process_pool(workers) as executor:
+            # CSVの列位置は登録した列番号と一致するとは限らないので、列名で渡す
+            key_names = [[tuple(cat.columns[no][column_no][0] for column_no in key) for key in stale[no]] for no in table_nos]
+            results = list(executor.map(check_unique_keys, [sources[no] for no in table_nos], key_names))
+        with db.transaction() as cur:
+            for table_no, uniques in zip(table_nos, results):
+                stat = stats[table_no]
+                for key, is_unique in zip(stale[table_no], uniques):
+                    if is_unique is None:
+                        continue
+                    sql = """INSERT OR REPLACE INTO key_state (table_no, column_nos, mtime, size, is_unique) VALUES (?, ?, ?, ?, ?)"""
+                    cur.execute(sql, [table_no, ','.join(map(str, key)), stat.st_mtime, stat.st_size, int(is_unique)])
+                    states[(table_no, key)] = (stat.st_mtime, stat.st_size, is_unique)
+
+    updated = 0
+    with db.transaction() as cur:
+        for (start_table_no, end_table_no), (start_cols, end_cols, rowids) in pairs.items():
+            start_state = states.get((start_table_no, tuple(sorted(start_cols))))
+            end_state = states.get((end_table_no, tuple(sorted(end_cols))))
+            start_cardinality = None if start_state is None else ('1' if start_state[2] else 'n')
+            end_cardinality = None if end_state is None else ('1' if end_state[2] else 'n')
+            for rowid in rowids:
+                connection = cat.connections[rowid]
+                if connection[5:7] == [start_cardinality, end_cardinality]:
+                    continue
+                sql = """UPDATE table_connection SET start_cardinality=?, end_cardinality=? WHERE rowid=?"""
+                cur.execute(sql, [start_cardinality, end_cardinality, rowid])
+                connection[5:7] = [start_cardinality, end_cardinality]
+                db.emit(ConnectionChanged(rowid, start_table_no, end_table_no))
+                updated += 1
+    return len(stale), updated
+
+def near_pairs(pos, cell):
+    import numpy as np
+
+    # 自分と周囲8セルにいるノードの組だけを列挙する
+    n = len(pos)
+    c = np.floor(pos / cell).astype(np.int64)
+    c -= c.min(axis=0)
+    height = int(c[:, 1].max()) + 3
+    key = (c[:, 0] + 1) * height + (c[:, 1] + 1)
+    order = np.argsort(key, kind='stable')
+    cell_keys, starts, counts = np.unique(key[order], return_index=True, return_counts=True)
+    nodes = np.arange(n)
+    pairs_i = []
+    pairs_j = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            neighbor = key + dx * height + dy
+            index = np.minimum(np.searchsorted(cell_keys, neighbor), len(cell_keys) - 1)
+            count = np.where(cell_keys[index] == neighbor, counts[index], 0)
+            total = int(count.sum())
+            if total == 0:
+                continue
+            offset = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+            pairs_i.append(np.repeat(nodes, count))
+            pairs_j.append(order[np.repeat(starts[index], count) + offset])
+    pairs_i = np.concatenate(pairs_i)
+    pairs_j = np.concatenate(pairs_j)
+    mask = pairs_i != pairs_j
+    return pairs_i[mask], pairs_j[mask]
+
+def force_layout(sizes, edges, positions=None, iterations=100, progress_every=10, cancel_event=None):
+    import numpy as np
+
+    # sizesは(幅, 高さ)、edgesはノード番号の組、positionsは中心座標。途中経過として左上座標を返していく
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    n = len(sizes)
+    if n == 0:
+        return
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    radius = np.hypot(sizes[:, 0], sizes[:, 1]) / 2
+    k = np.sqrt(np.sum((sizes[:, 0] + 20) * (sizes[:, 1] + 20)) * 3 / n)
+    side = np.sqrt(n) * k
+    cell = 2 * k
+    coarse = 8
+
+    rng = np.random.default_rng(0)
+    pos = None if positions is None else np.asarray(positions, dtype=float).reshape(-1, 2)
+    if pos is None or np.all(pos.std(axis=0) == 0):
+        pos = rng.random((n, 2)) * side
+    else:
+        # 今の配置の形を残したまま広さだけ合わせる
+        pos = (pos - pos.mean(axis=0)) / np.maximum(pos.std(axis=0), 1e-9) * side / 3.5
+    temperature = side / 10
+    # 1回の反復はノード数に比例して重くなるので、回数を減らしても同じだけ冷えるようにする
+    iterations = max(1, min(iterations, max(20, layout_work_limit // n)))
+    cooling = 0.95 ** (100 / iterations)
+
+    for iteration in range(iterations):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        disp = np.zeros((n, 2))
+
+        # 近くのノードは大きさを考えた隙間で反発させる
+        i, j = near_pairs(pos, cell)
+        d = pos[i] - pos[j]
+        dist = np.hypot(d[:, 0], d[:, 1])
+        same = dist < 1e-6
+        d[same] = rng.random((int(same.sum()), 2)) - 0.5
+        dist[same] = np.hypot(d[same, 0], d[same, 1])
+        gap = np.maximum(dist - radius[i] - radius[j], 1.0)
+        f = np.where(gap < 2 * k, k * k / gap / dist, 0.0)
+        disp[:, 0] += np.bincount(i, weights=d[:, 0] * f, minlength=n)
+        disp[:, 1] += np.bincount(i, weights=d[:, 1] * f, minlength=n)
+
+        # 遠くのノードはグリッドごとの重心にまとめて反発させる
+        low = pos.min(axis=0)
+        span = np.maximum(pos.max(axis=0) - low, 1e-9)
+        c = np.minimum((pos - low) / span * coarse, coarse - 1).astype(np.int64)
+        key = c[:, 0] * coarse + c[:, 1]
+        mass = np.bincount(key, minlength=coarse * coarse)
+        used = mass > 0
+        mass = mass[used]
+        centroid = np.stack([np.bincount(key, weights=pos[:, axis], minlength=coarse * coarse)[used] for axis in (0, 1)], axis=1) / mass[:, None]
+        soft = (span.max() / coarse) ** 2
+        d = pos[:, None, :] - centroid[None, :, :]
+        f = k * k * mass[None, :] / (d[:, :, 0] ** 2 + d[:, :, 1] ** 2 + soft)
+        disp[:, 0] += np.sum(d[:, :, 0] * f, axis=1)
+        disp[:, 1] += np.sum(d[:, :, 1] * f, axis=1)
+
+        if len(edges) > 0:
+            d = pos[edges[:, 0]] - pos[edges[:, 1]]
+            f = np.hypot(d[:, 0], d[:, 1]) / k
+            for axis in (0, 1):
+                disp[:, axis] -= np.bincount(edges[:, 0], weights=d[:, axis] * f, minlength=n)
+                disp[:, axis] += np.bincount(edges[:, 1], weights=d[:, axis] * f, minlength=n)
+
+        # 本来の広さより外に出たノードだけを中心へ引き戻す
+        center = pos - pos.mean(axis=0)
+        outside = np.maximum(np.hypot(center[:, 0], center[:, 1]) / (side / 2) - 1, 0.0)
+        disp -= center * (outside * k / side)[:, None]
+
+        length = np.maximum(np.hypot(disp[:, 0], disp[:, 1]), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature = max(temperature * cooling, k / 50)
+        if (iteration + 1) % progress_every == 0:
+            yield layout_points(pos, sizes)
+
+    remove_overlaps(pos, sizes)
+    yield layout_points(pos, sizes)
+
+def remove_overlaps(pos, sizes, margin=10, passes=100):
+    import numpy as np
+
+    half = (sizes + margin) / 2
+    cell = 2 * half.max()
+    previous = None
+    for _ in range(passes):
+        i, j = near_pairs(pos, cell)
+        keep = i < j
+        i, j = i[keep], j[keep]
+        d = pos[i] - pos[j]
+        overlap_x = half[i, 0] + half[j, 0] - np.abs(d[:, 0])
+        overlap_y = half[i, 1] + half[j, 1] - np.abs(d[:, 1])
+        hit = (overlap_x > 0) & (overlap_y > 0)
+        count = int(hit.sum())
+        if count == 0:
+            break
+        # 押し合いで減らなくなったら全体を少し広げて隙間を作る
+        if previous is not None and count > previous * 0.95:
+            center = pos.mean(axis=0)
+            pos -= center
+            pos *= 1.05
+            pos += center
+        previous = count
+        # 残った重なりは少ないので順番に押し出す（まとめて動かすより収束が速い）
+        for a, b in zip(i[hit].tolist(), j[hit].tolist()):
+            dx = pos[a, 0] - pos[b, 0]
+            dy = pos[a, 1] - pos[b, 1]
+            ox = half[a, 0] + half[b, 0] - abs(dx)
+            oy = half[a, 1] + half[b, 1] - abs(dy)
+            if ox <= 0 or oy <= 0:
+                continue
+            if ox < oy:
+                shift = (ox / 2 + 1) * (1 if dx >= 0 else -1)
+                pos[a, 0] += shift
+                pos[b, 0] -= shift
+            else:
+                shift = (oy / 2 + 1) * (1 if dy >= 0 else -1)
+                pos[a, 1] += shift
+                pos[b, 1] -= shift
+
+def layout_points(pos, sizes):
+    points = pos - sizes / 2
+    return points - points.min(axis=0)
+
+def insert_connection(start_table, end_table, connection_columns, timeERs):
+    with db.transaction() as cur:
+        cat = catalog.get()
+        start_table_no = get_table_no(start_table)
+        end_table_no = get_table_no(end_table)
+        for i, (start_col, end_col) in enumerate(connection_columns):
+            connection = [start_table_no, end_table_no, get_column_no(start_table, start_col), get_column_no(end_table, end_col), timeERs[i], None, None]
+            if timeERs[i] is None:
+                sql = """INSERT INTO table_connection (start_table_no, end_table_no, start_column_no, end_column_no) VALUES (?, ?, ?, ?)"""
+                cur.execute(sql, connection[:4])
+            else:
+                sql = """INSERT INTO table_connection (start_table_no, end_table_no, start_column_no, end_column_no, timeER) VALUES (?, ?, ?, ?, ?)"""
+                cur.execute(sql, connection[:5])
+            cat.add_connection(cur.lastrowid, connection)
+            db.emit(ConnectionAdded(cur.lastrowid, start_table_no, end_table_no))
+
+def update_table(old_table_name, new_table_name):
+    with db.transaction() as cur:
+        table_no = get_table_no(old_table_name)
+        sql = """UPDATE table_list SET table_name=? WHERE table_no=?"""
+        cur.execute(sql, [new_table_name, table_no])
+        sql = """UPDATE name_search SET grams=? WHERE rowid=?"""
+        cur.execute(sql, [name_grams(new_table_name), name_rowid(table_no)])
+        catalog.get().rename_table(table_no, new_table_name)
+        db.emit(TableRenamed(table_no, old_table_name, new_table_name))
+
+def update_columns(table_name, columns):
+    with db.transaction() as cur:
+        cat = catalog.get()
+        table_no = get_table_no(table_name)
+        old_column_nos = list(cat.columns[table_no])
+
+        # 位置で対応づけて列番号で更新する
+        for column_no, new_col in zip(old_column_nos, columns):
+            sql = """UPDATE table_columns SET column=? WHERE table_no=? and column_no=?"""
+            cur.execute(sql, [new_col, table_no, column_no])
+            sql = """UPDATE name_search SET grams=? WHERE rowid=?"""
+            cur.execute(sql, [name_grams(new_col), name_rowid(table_no, column_no)])
+            cat.set_column(table_no, column_no, new_col, *cat.columns[table_no][column_no][1:])
+
+        # 列を消した取り込みの後は番号が飛んでいるので、位置ではなく最大の番号の次から振る
+        column_no = max(old_column_nos, default=-1)
+        for col in columns[len(old_column_nos):]:
+            column_no += 1
+            sql = """INSERT INTO table_columns (table_no,column_no,column) VALUES (?, ?, ?)"""
+            cur.execute(sql, (table_no, column_no, col))
+            sql = """INSERT INTO name_search (rowid, grams) VALUES (?, ?)"""
+            cur.execute(sql, [name_rowid(table_no, column_no), name_grams(col)])
+            cat.set_column(table_no, column_no, col)
+        db.emit(ColumnsChanged(table_no, table_name))
+
+def delete_table(table_name):
+    with db.transaction() as cur:
+        # 削除前にテーブル番号を引いておく
+        table_no = get_table_no(table_name)
+        if table_no is None:
+            return
+
+        sql = """DELETE FROM table_list WHERE table_no=?"""
+        cur.execute(sql, [table_no])
+
+        sql = """DELETE FROM table_columns WHERE table_no=?"""
+        cur.execute(sql, [table_no])
+
+        sql = """DELETE FROM table_connection WHERE start_table_no=?"""
+        cur.execute(sql, [table_no])
+        sql = """DELETE FROM table_connection WHERE end_table_no=?"""
+        cur.execute(sql, [table_no])
+
+        sql = """DELETE FROM table_source WHERE table_no=?"""
+        cur.execute(sql, [table_no])
+        sql = """DELETE FROM column_sketch WHERE table_no=?"""
+        cur.execute(sql, [table_no])
+        sql = """DELETE FROM key_state WHERE table_no=?"""
+        cur.execute(sql, [table_no])
+        sql = """DELETE FROM table_layout WHERE table_no=?"""
+        cur.execute(sql, [table_no])
+        sql = """DELETE FROM schema_source WHERE table_no=?"""
+        cur.execute(sql, [table_no])
+        sql = """DELETE FROM name_search WHERE rowid BETWEEN ? AND ?"""
+        cur.execute(sql, [name_rowid(table_no), name_rowid(table_no) | 0xFFFFF])
+
+        cat = catalog.get()
+        for rowid in sorted(set(cat.start_connections[table_no] + cat.end_connections[table_no])):
+            connection = cat.connections[rowid]
+            db.emit(ConnectionRemoved(rowid, connection[0], connection[1]))
+        cat.remove_table(table_no)
+        db.emit(TableDeleted(table_no, table_name))
+
+def save_layouts(layouts):
+    with db.transaction() as cur:
+        sql = """INSERT OR REPLACE INTO table_layout (table_no, x, y) VALUES (?, ?, ?)"""
+        cur.executemany(sql, [(table_no, x, y) for table_no, (x, y) in layouts.items() if table_no is not None])
+
+def get_layouts():
+    layouts = {}
+    for table_no, x, y in db.execute('SELECT table_no, x, y FROM table_layout').fetchall():
+        layouts[table_no] = (x, y)
+    return layouts
+
+def get_column_no(table_name, column):
+    cat = catalog.get()
+    return cat.column_nos.get(cat.table_nos.get(table_name), {}).get(column)
+
+def get_table_no(table_name):
+    return catalog.get().table_nos.get(table_name)
+
+def get_table_name(table_no):
+    return catalog.get().table_names.get(table_no)
+
+def get_column_name(table_name, column_no):
+    cat = catalog.get()
+    column = cat.columns.get(cat.table_nos.get(table_name), {}).get(column_no)
+    return None if column is None else column[0]
+
+def get_tables():
+    return list(catalog.get().table_names.values())
+
+def get_table_columns(table_name):
+    cat = catalog.get()
+    return [col[0] for col in cat.columns.get(cat.table_nos.get(table_name), {}).values()]
+
+def get_table_column_details(table_name):
+    cat = catalog.get()
+    return [list(col) for col in cat.columns.get(cat.table_nos.get(table_name), {}).values()]
+
+def get_connection_count(table_name):
+    cat = catalog.get()
+    table_no = cat.table_nos.get(table_name)
+    return len(cat.start_connections.get(table_no, [])) + len(cat.end_connections.get(table_no, []))
+
+def get_connection_keys(start_table, end_table):
+    # 開始→終了の向きの接続だけを返す（逆向きは含めない）
+    cat = catalog.get()
+    start_table_no = cat.table_nos.get(start_table)
+    end_table_no = cat.table_nos.get(end_table)
+    keys = []
+    for rowid in cat.start_connections.get(start_table_no, []):
+        connection = cat.connections[rowid]
+        if connection[1] != end_table_no:
+            continue
+        start_column = cat.columns[start_table_no].get(connection[2], [None])[0]
+        end_column = cat.columns[end_table_no].get(connection[3], [None])[0]
+        keys.append([start_column, end_column, connection[4], connection[5], connection[6]])
+    return keys
+
+def find_join_paths(start_table, end_table, k=1):
+    # テーブル間をつなぐ接続の経路を短い順にk本返す。
+    # 経路は (元テーブル, 先テーブル, [[元の列, 先の列, timeER], ...]) の並びで、列は経路の向きに揃える
+    cat = catalog.get()
+    start_no = cat.table_nos.get(start_table)
+    end_no = cat.table_nos.get(end_table)
+    if start_no is None or end_no is None:
+        return []
+    paths = []
+    for table_nos in cat.get_graph().shortest_paths(start_no, end_no, k):
+        hops = []
+        for from_no, to_no in zip(table_nos, table_nos[1:]):
+            keys = []
+            for rowid in cat.start_connections.get(from_no, []):
+                connection = cat.connections[rowid]
+                if connection[1] == to_no:
+                    keys.append([cat.columns[from_no].get(connection[2], [None])[0], cat.columns[to_no].get(connection[3], [None])[0], connection[4]])
+            for rowid in cat.start_connections.get(to_no, []):
+                connection = cat.connections[rowid]
+                if connection[1] == from_no:
+                    keys.append([cat.columns[from_no].get(connection[3], [None])[0], cat.columns[to_no].get(connection[2], [None])[0], connection[4]])
+            hops.append((cat.table_names[from_no], cat.table_names[to_no], keys))
+        paths.append(hops)
+    return paths
+
+def search_names(query, limit=100):
+    # テーブル名・列名の部分一致を (テーブル名, 列名) で返す。テーブル名の一致は列名がNone
+    text = normalize_name(query).strip()
+    if text == '':
+        return []
+    if len(text) == 1:
+        match = gram_token(text) + '*'
+        prefix_match = f'"{gram_token(chr(0) + text)}"'
+    else:
+        tokens = ' '.join(gram_token(text[i:i+2]) for i in range(len(text)-1))
+        match = f'"{tokens}"'
+        prefix_match = f'"{gram_token(chr(0) + text[0])} {tokens}"'
+
+    # テーブル名、前方一致、その他の順に件数を絞って引く
+    rowids = []
+    sql = """SELECT rowid FROM name_search WHERE name_search MATCH ? AND (rowid & 1048575) = 0 LIMIT ?"""
+    rowids += [row[0] for row in db.execute(sql, [match, limit]).fetchall()]
+    sql = """SELECT rowid FROM name_search WHERE name_search MATCH ? LIMIT ?"""
+    rowids += [row[0] for row in db.execute(sql, [prefix_match, limit]).fetchall()]
+    rowids += [row[0] for row in db.execute(sql, [match, limit]).fetchall()]
+
+    cat = catalog.get()
+    results = []
+    seen = set()
+    for rowid in rowids:
+        if rowid in seen:
+            continue
+        seen.add(rowid)
+        table_no = rowid >> 20
+        column_no = (rowid & 0xFFFFF) - 1
+        if table_no not in cat.table_names:
+            continue
+        if column_no < 0:
+            results.append((cat.table_names[table_no], None))
+        elif column_no in cat.columns[table_no]:
+            results.append((cat.table_names[table_no], cat.columns[table_no][column_no][0]))
+        if len(results) >= limit:
+            break
+    return results
+
+def get_connection_counts():
+    cat = catalog.get()
+    connect_nums = {}
+    for table_no, table_name in cat.table_names.items():
+        connect_nums[table_name] = len(cat.start_connections[table_no]) + len(cat.end_connections[table_no])
+    return connect_nums
+
+def get_connection(start_table=None, end_table=None):
+    cat = catalog.get()
+    # (接続, 逆向きかどうか) の並び
+    rows = []
+    if start_table is None:
+        rows = [(connection, False) for connection in cat.connections.values()]
+    elif end_table is None:
+        table_no = cat.table_nos.get(start_table)
+        rows = [(cat.connections[rowid], False) for rowid in cat.start_connections.get(table_no, [])]
+        rows += [(cat.connections[rowid], True) for rowid in cat.end_connections.get(table_no, [])]
+    else:
+        start_table_no = cat.table_nos.get(start_table)
+        end_table_no = cat.table_nos.get(end_table)
+        rows = [(cat.connections[rowid], False) for rowid in cat.start_connections.get(start_table_no, []) if cat.connections[rowid][1] == end_table_no]
+        rows += [(cat.connections[rowid], True) for rowid in cat.start_connections.get(end_table_no, []) if cat.connections[rowid][1] == start_table_no]
+
+    tables = []
+    keys = {}
+    for connection, reverse in rows:
+        st = cat.table_names.get(connection[0])
+        es = cat.table_names.get(connection[1])
+        start_column = cat.columns.get(connection[0], {}).get(connection[2], [None])[0]
+        end_column = cat.columns.get(connection[1], {}).get(connection[3], [None])[0]
+        start_cardinality, end_cardinality = connection[5], connection[6]
+        if reverse:
+            st, es = es, st
+            start_column, end_column = end_column, start_column
+            start_cardinality, end_cardinality = end_cardinality, start_cardinality
+
+        con_key = f'{st}-{es}'
+        tables.append([st, es])
+        if con_key in keys:
+            keys[con_key].append([start_column, end_column, connection[4], start_cardinality, end_cardinality])
+        else:
+            keys[con_key] = [[start_column, end_column, connection[4], start_cardinality, end_cardinality]]
+    return tables, keys
+
+def write_json_items(out, items):
+    # json.dump(indent=1)と同じ形の配列を、要素を1件ずつ変換して書く
+    empty = True
+    for item in items:
+        out.write('\n  ' if empty else ',\n  ')
+        out.write(json.dumps(item, ensure_ascii=False, indent=1).replace('\n', '\n  '))
+        empty = False
+    out.write(']' if empty else '\n ]')
+
+def export_json(out):
+    # テーブル・列・接続をJSONで書き出す（全体を組み立てずに1件ずつ書く）
+    cat = catalog.get()
+
+    def tables():
+        for table_no, table_name in cat.table_names.items():
+            columns = [{'name': column, 'type': type, 'unique': unique_flag == '1'} for column, type, unique_flag in cat.columns.get(table_no, {}).values()]
+            yield {'name': table_name, 'columns': columns}
+
+    def connections():
+        for start_no, end_no, start_col_no, end_col_no, timeER, start_cardinality, end_cardinality in cat.connections.values():
+            yield {
+                'start_table': cat.table_names.get(start_no),
+                'end_table': cat.table_names.get(end_no),
+                'start_column': cat.columns.get(start_no, {}).get(start_col_no, [None])[0],
+                'end_column': cat.columns.get(end_no, {}).get(end_col_no, [None])[0],
+                'timeER': timeER,
+                'start_cardinality': start_cardinality,
+                'end_cardinality': end_cardinality,
+            }
+
+    out.write('{\n "tables": [')
+    write_json_items(out, tables())
+    out.write(',\n "connections": [')
+    write_json_items(out, connections())
+    out.write('\n}\n')
+
+def estimate_text_size(text, size=20):
+    # Tkなしで画面表示に近い大きさを見積もる（全角は1文字分、半角はその6割の幅）
+    px = size * 96 / 72
+    width = sum(px if unicodedata.east_asian_width(c) in 'WF' else px * 0.6 for c in text)
+    return width, px * 1.25
+
+def get_diagram_boxes():
+    # 保存済みの配置を使い、配置のないテーブルは図の下に並べる
+    cat = catalog.get()
+    layouts = get_layouts()
+    boxes = {}
+    unplaced = []
+    for table_no, table_name in cat.table_names.items():
+        width, height = estimate_text_size(table_name)
+        if table_no in layouts:
+            x, y = layouts[table_no]
+            boxes[table_no] = [x, y, width, height]
+        else:
+            unplaced.append(table_no)
+            boxes[table_no] = [0, 0, width, height]
+    if len(unplaced) > 0:
+        left = min([boxes[table_no][0] for table_no in layouts if table_no in boxes], default=0)
+        top = max([boxes[table_no][1] + boxes[table_no][3] for table_no in layouts if table_no in boxes], default=0) + 50
+        columns = max(1, math.ceil(math.sqrt(len(unplaced))))
+        for i, table_no in enumerate(unplaced):
+            boxes[table_no][0] = left + (i % columns) * 250
+            boxes[table_no][1] = top + (i // columns) * 60
+    return boxes
+
+def get_connection_colors():
+    # GUIと同じく、テーブルの組ごとに1本の線にして、timeERのある接続を含めば赤にする
+    cat = catalog.get()
+    for start_no in cat.table_names:
+        colors = {}
+        for rowid in cat.start_connections.get(start_no, []):
+            connection = cat.connections[rowid]
+            if connection[4] is not None:
+                colors[connection[1]] = 'red'
+            else:
+                colors.setdefault(connection[1], 'black')
+        for end_no, color in colors.items():
+            if end_no in cat.table_names:
+                yield start_no, end_no, color
+
+def xml_escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+def export_svg(out):
+    cat = catalog.get()
+    boxes = get_diagram_boxes()
+    margin = 20
+    x1 = min([x for x, _, _, _ in boxes.values()], default=0) - margin
+    y1 = min([y for _, y, _, _ in boxes.values()], default=0) - margin
+    x2 = max([x + w for x, _, w, _ in boxes.values()], default=0) + margin
+    y2 = max([y + h for _, y, _, h in boxes.values()], default=0) + margin
+    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{x1:.0f} {y1:.0f} {x2-x1:.0f} {y2-y1:.0f}" width="{x2-x1:.0f}" height="{y2-y1:.0f}">\n')
+    out.write('<rect x="{:.0f}" y="{:.0f}" width="{:.0f}" height="{:.0f}" fill="white"/>\n'.format(x1, y1, x2-x1, y2-y1))
+    # 線を先に書き、テーブルの四角で端を隠す
+    out.write('<g stroke-width="5">\n')
+    for start_no, end_no, color in get_connection_colors():
+        sx, sy, sw, sh = boxes[start_no]
+        ex, ey, ew, eh = boxes[end_no]
+        out.write(f'<line x1="{sx+sw/2:.1f}" y1="{sy+sh/2:.1f}" x2="{ex+ew/2:.1f}" y2="{ey+eh/2:.1f}" stroke="{color}"/>\n')
+    out.write('</g>\n')
+    out.write('<g font-size="20pt" text-anchor="middle" dominant-baseline="central">\n')
+    for table_no, table_name in cat.table_names.items():
+        x, y, w, h = boxes[table_no]
+        out.write(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" fill="white" stroke="black"/>')
+        out.write(f'<text x="{x+w/2:.1f}" y="{y+h/2:.1f}">{xml_escape(table_name)}</text>\n')
+    out.write('</g>\n</svg>\n')
+
+def dot_quote(text):
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def export_dot(out):
+    # 保存済みの配置はposに入れる（neato -n でそのまま使える。DOTはy軸が上向き）
+    cat = catalog.get()
+    boxes = get_diagram_boxes()
+    out.write('digraph er {\n')
+    out.write('  node [shape=box];\n')
+    for table_no, table_name in cat.table_names.items():
+        x, y, w, h = boxes[table_no]
+        out.write(f'  {dot_quote(table_name)} [pos="{(x+w/2)*0.75:.1f},{-(y+h/2)*0.75:.1f}!"];\n')
+    for start_no, end_no, color in get_connection_colors():
+        out.write(f'  {dot_quote(cat.table_names[start_no])} -> {dot_quote(cat.table_names[end_no])} [color={color}];\n')
+    out.write('}\n')
+
+def sql_quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def export_ddl(out):
+    # 接続は開始テーブル側から終了テーブルを参照する外部キーとして書く
+    cat = catalog.get()
+    for table_no, table_name in cat.table_names.items():
+        lines = []
+        for column, type, unique_flag in cat.columns[table_no].values():
+            line = sql_quote(column)
+            if type:
+                line += ' ' + type
+            if unique_flag == '1':
+                line += ' UNIQUE'
+            lines.append(line)
+        foreign_keys = {}
+        for rowid in cat.start_connections.get(table_no, []):
+            end_no, start_col_no, end_col_no, timeER = cat.connections[rowid][1:5]
+            start_column = cat.columns[table_no].get(start_col_no)
+            end_column = cat.columns.get(end_no, {}).get(end_col_no)
+            if start_column is None or end_column is None:
+                continue
+            foreign_key = foreign_keys.setdefault((end_no, timeER), [[], []])
+            foreign_key[0].append(sql_quote(start_column[0]))
+            foreign_key[1].append(sql_quote(end_column[0]))
+        for (end_no, timeER), (start_columns, end_columns) in foreign_keys.items():
+            line = f'FOREIGN KEY ({", ".join(start_columns)}) REFERENCES {sql_quote(cat.table_names[end_no])} ({", ".join(end_columns)})'
+            if timeER is not None:
+                line += f' /* timeER: {timeER.replace("*/", "* /")} */'
+            lines.append(line)
+        out.write(f'CREATE TABLE {sql_quote(table_name)} (\n')
+        out.write(',\n'.join('    ' + line for line in lines))
+        out.write('\n);\n')
@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gui
+
+class StubCanvas():
+    # 描いた図形を記録するだけのキャンバス（画面なしで描画結果を確かめる）
+    def __init__(self):
+        self.lines = []
+        self.ovals = []
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    def delete(self, *args):
+        self.lines = []
+        self.ovals = []
+
+    def create_line(self, *coords, **kwargs):
+        self.lines.append((coords, kwargs))
+
+    def create_oval(self, *coords, **kwargs):
+        self.ovals.append((coords, kwargs))
+
+class StubEntity():
+    def __init__(self, x, y):
+        self.center = gui.Point(x, y)
+
+    def get_center(self):
+        return self.center
+
+class StubConnection():
+    def __init__(self, start_e, end_e, color='black'):
+        self.start_e = start_e
+        self.end_e = end_e
+        self.color = color
+
+class DrawClustersTest(unittest.TestCase):
+    def test_centroids(self):
+        scene = gui.Scene(StubCanvas())
+        scene.scale = 0.1
+        # 区画は 32 / 0.1 = 320 単位ごと
+        a1, a2 = StubEntity(100, 100), StubEntity(120, 100)
+        b1, b2 = StubEntity(1000, 1000), StubEntity(1020, 1010)
+        connections = [StubConnection(a1, b1), StubConnection(a1, b2, 'red'), StubConnection(a2, b1), StubConnection(a1, b1)]
+        # bの塊は画面外で、線の端としてだけ出てくる
+        scene.draw_clusters({a1, a2}, connections)
+
+        self.assertEqual(len(scene.canvas.lines), 1)
+        (x1, y1, x2, y2), options = scene.canvas.lines[0]
+        self.assertEqual(options['fill'], 'red')
+        self.assertAlmostEqual(x1, 11.0)
+        self.assertAlmostEqual(y1, 10.0)
+        self.assertAlmostEqual(x2, 101.0)
+        self.assertAlmostEqual(y2, 100.5)
+
+        # 見えている塊だけ丸を描き、大きさはエンティティの数で決まる
+        self.assertEqual(len(scene.canvas.ovals), 1)
+        (ox1, oy1, ox2, oy2), _ = scene.canvas.ovals[0]
+        self.assertAlmostEqual((ox1 + ox2) / 2, 11.0)
+        self.assertAlmostEqual(ox2 - ox1, 2 * (2 + 2 ** 0.5 * 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,328 @@
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+
+class ModelTestCase(unittest.TestCase):
+    def setUp(self):
+        # 作業用のtable.dbを一時ディレクトリに作って差し替える
+        self.directory = tempfile.TemporaryDirectory()
+        model.db.close()
+        model.db.path = os.path.join(self.directory.name, 'table.db')
+        model.catalog.invalidate()
+        model.init_table()
+
+    def tearDown(self):
+        model.db.close()
+        model.catalog.invalidate()
+        self.directory.cleanup()
+
+    def create_source(self, filename, script):
+        path = os.path.join(self.directory.name, filename)
+        conn = sqlite3.connect(path)
+        conn.executescript(script)
+        conn.close()
+        return path
+
+    def create_csv(self, filename, text, encoding='utf-8'):
+        path = os.path.join(self.directory.name, 'csv', filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding=encoding, newline='') as fp:
+            fp.write(text)
+        return path
+
+class CatalogTest(ModelTestCase):
+    def test_reload_after_commit_from_other_connection(self):
+        model.insert_table('a', ['id'])
+        self.assertEqual(model.get_tables(), ['a'])
+        generation = model.get_catalog_generation()
+
+        # 別プロセスのCLIと同じく、別の接続から書き込む
+        conn = sqlite3.connect(model.db.path)
+        with conn:
+            conn.execute("INSERT INTO table_list (table_no, table_name) VALUES (100, 'b')")
+            conn.execute("INSERT INTO table_columns (table_no, column_no, column) VALUES (100, 0, 'id')")
+        conn.close()
+
+        interval = model.data_version_interval
+        model.data_version_interval = 0
+        try:
+            self.assertEqual(model.get_tables(), ['a', 'b'])
+            self.assertEqual(model.get_table_columns('b'), ['id'])
+            self.assertNotEqual(model.get_catalog_generation(), generation)
+            # 自分の書き込みでは読み直さない
+            generation = model.get_catalog_generation()
+            model.insert_table('c', ['id'])
+            self.assertEqual(model.get_catalog_generation(), generation)
+        finally:
+            model.data_version_interval = interval
+
+class MigrationTest(ModelTestCase):
+    def test_migrate_baseline_database(self):
+        # 版管理を入れる前のtable.db（3テーブルだけでuser_versionは0）
+        path = self.create_source('baseline.db', '''
+        CREATE TABLE table_list (table_no INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL);
+        CREATE TABLE table_columns (table_no INTEGER NOT NULL, column_no INTEGER NOT NULL, column TEXT NOT NULL, type TEXT, unique_flag TEXT);
+        CREATE TABLE table_connection (start_table_no INTEGER NOT NULL, end_table_no INTEGER NOT NULL, start_column_no INTEGER NOT NULL, end_column_no INTEGER NOT NULL, timeER TEXT, start_cardinality TEXT, end_cardinality TEXT);
+        INSERT INTO table_list (table_no, table_name) VALUES (1, '顧客'), (2, '受注');
+        INSERT INTO table_columns VALUES (1, 0, '顧客コード', 'int', '1'), (1, 1, '氏名', NULL, NULL), (2, 0, '受注番号', NULL, NULL), (2, 1, '顧客コード', NULL, NULL);
+        INSERT INTO table_connection VALUES (2, 1, 1, 0, NULL, 'N', '1');
+        ''')
+        model.db.close()
+        model.db.path = path
+        model.catalog.invalidate()
+        model.init_table()
+
+        conn = model.db.connect()
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], len(model.migrations))
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()}
+        self.assertLessEqual({'idx_table_list_name', 'idx_table_connection_start', 'idx_schema_source_name'}, indexes)
+        self.assertIn('source_name', [row[1] for row in conn.execute('PRAGMA table_info(schema_source)').fetchall()])
+
+        # 既存の行は残り、検索索引は既存の名前から作られる
+        self.assertEqual(model.get_tables(), ['顧客', '受注'])
+        self.assertEqual(model.get_table_column_details('顧客'), [['顧客コード', 'int', '1'], ['氏名', None, None]])
+        self.assertEqual(model.get_connection_keys('受注', '顧客'), [['顧客コード', '顧客コード', None, 'N', '1']])
+        self.assertEqual(model.search_names('顧客'), [('顧客', None), ('顧客', '顧客コード'), ('受注', '顧客コード')])
+
+        # 2回目は何もしない
+        model.init_table()
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], len(model.migrations))
+        model.insert_table('商品', ['商品コード'])
+        self.assertEqual(model.search_names('商品'), [('商品', None), ('商品', '商品コード')])
+
+class NameSearchTest(ModelTestCase):
+    def test_index_follows_insert_rename_delete(self):
+        model.insert_table('顧客マスタ', ['顧客コード', '氏名'])
+        model.insert_table('受注', ['受注番号', '顧客コード'])
+        self.assertEqual(model.search_names('顧客'), [('顧客マスタ', None), ('顧客マスタ', '顧客コード'), ('受注', '顧客コード')])
+
+        # テーブル名・列名を変えると古い名前では引けなくなる
+        model.update_table('顧客マスタ', '取引先マスタ')
+        model.update_columns('取引先マスタ', ['取引先コード', '氏名'])
+        self.assertEqual(model.search_names('顧客'), [('受注', '顧客コード')])
+        self.assertEqual(model.search_names('取引先'), [('取引先マスタ', None), ('取引先マスタ', '取引先コード')])
+
+        # 列の追加は追加した列だけ引ける
+        model.update_columns('受注', ['受注番号', '顧客コード', '取引先名'])
+        self.assertEqual(model.search_names('取引先'), [('取引先マスタ', None), ('取引先マスタ', '取引先コード'), ('受注', '取引先名')])
+
+        # 削除したテーブルの行は索引にも残らない
+        model.delete_table('取引先マスタ')
+        self.assertEqual(model.search_names('取引先'), [('受注', '取引先名')])
+        conn = model.db.connect()
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM name_search').fetchone()[0], 4)
+
+class JoinPathTest(ModelTestCase):
+    def test_k_shortest_paths(self):
+        model.insert_tables([('a', ['id', 'b_id', 'c_id', 'd_id']), ('b', ['id', 'd_id']), ('c', ['id']), ('d', ['id', 'c_id']), ('e', ['id'])])
+        model.insert_connection('a', 'd', [['d_id', 'id']], [None])
+        model.insert_connection('a', 'b', [['b_id', 'id']], [None])
+        model.insert_connection('b', 'd', [['d_id', 'id']], [None])
+        model.insert_connection('a', 'c', [['c_id', 'id']], [None])
+        # 逆向きの接続も通れる。列は経路の向きに並べ替えて返す
+        model.insert_connection('d', 'c', [['c_id', 'id']], [None])
+
+        paths = model.find_join_paths('a', 'd', k=5)
+        self.assertEqual([[hop[:2] for hop in path] for path in paths], [
+            [('a', 'd')],
+            [('a', 'b'), ('b', 'd')],
+            [('a', 'c'), ('c', 'd')],
+        ])
+        self.assertEqual(paths[2][1][2], [['id', 'c_id', None]])
+        self.assertEqual(model.find_join_paths('a', 'd', k=2), paths[:2])
+        self.assertEqual(model.find_join_paths('a', 'e', k=3), [])
+
+class ImportCsvTest(ModelTestCase):
+    def test_unreadable_file_is_skipped(self):
+        self.create_csv('a.csv', 'id,name\n1,x\n')
+        sjis = self.create_csv('b.csv', '番号,名前\n1,あ\n', encoding='cp932')
+        self.create_csv('c.csv', 'id,price\n1,2\n')
+
+        imported, skipped, _ = model.import_csv_dir(os.path.join(self.directory.name, 'csv'))
+        self.assertEqual(imported, 2)
+        self.assertEqual(sorted(model.get_tables()), ['a', 'c'])
+        self.assertEqual([filename for filename, _ in skipped], [sjis])
+
+    def test_profile_does_not_hold_write_lock(self):
+        self.create_csv('a.csv', 'id,name\n1,x\n2,y\n')
+        self.create_csv('b.csv', 'id,price\n1,2\n')
+        locked = []
+        profile_csv = model.profile_csv
+
+        def check_lock(filename, executor=None):
+            # 推定中に別の接続から書き込めること
+            conn = sqlite3.connect(model.db.path, timeout=0)
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.rollback()
+            except sqlite3.OperationalError:
+                locked.append(filename)
+            finally:
+                conn.close()
+            return profile_csv(filename, executor)
+
+        model.profile_csv = check_lock
+        try:
+            model.import_csv_dir(os.path.join(self.directory.name, 'csv'), workers=1, profile=True)
+        finally:
+            model.profile_csv = profile_csv
+        self.assertEqual(locked, [])
+        self.assertEqual(model.get_table_column_details('a'), [['id', 'int', '1'], ['name', 'text', '1']])
+
+    def test_hash_budget_is_shared_by_columns(self):
+        # 全列あわせた正確なハッシュ数が上限を超えない
+        budget = model.HashBudget(limit=500)
+        profiles = [model.ColumnProfile(budget) for _ in range(5)]
+        for i in range(1000):
+            for j, profile in enumerate(profiles):
+                profile.add(str(i if j < 4 else i % 100))
+                self.assertLessEqual(sum(len(profile.hashes) for profile in profiles), 500)
+        self.assertEqual(budget.used, sum(len(profile.hashes) for profile in profiles))
+        self.assertEqual([profile.is_unique() for profile in profiles], [True, True, True, True, False])
+
+class CsvColumnMappingTest(ModelTestCase):
+    def test_profiles_follow_column_names(self):
+        # 登録時にCSVの列を消した場合でも、推定結果は同じ名前の列に入る
+        path = self.create_csv('items.csv', 'id,memo,price\n1,a,10\n2,a,20\n')
+        model.insert_table('items', ['id', 'price'])
+        columns, profiles = model.profile_csv(path)
+        model.update_column_profiles('items', columns, profiles)
+        self.assertEqual(model.get_table_column_details('items'), [['id', 'int', '1'], ['price', 'int', '1']])
+
+    def test_cardinality_follows_column_names(self):
+        parent = self.create_csv('parent.csv', 'memo,id\na,1\na,2\n')
+        child = self.create_csv('child.csv', 'pid\n1\n1\n')
+        model.insert_table('parent', ['id'])
+        model.insert_table('child', ['pid'])
+        model.set_table_source('parent', parent)
+        model.set_table_source('child', child)
+        model.insert_connection('child', 'parent', [['pid', 'id']], [None])
+        model.update_cardinalities(workers=1)
+        _, keys = model.get_connection('child', 'parent')
+        self.assertEqual([row[3:5] for row in keys['child-parent']], [['n', '1']])
+
+    def test_profile_cancel(self):
+        path = self.create_csv('big.csv', 'id\n' + ''.join(f'{i}\n' for i in range(model.profile_chunk_rows * 3)))
+        cancel_event = threading.Event()
+        cancel_event.set()
+        self.assertIsNone(model.profile_csv(path, cancel_event=cancel_event))
+
+class DiscoverConnectionsTest(ModelTestCase):
+    def test_foreign_key_covering_all_parent_keys(self):
+        # 子が親のキーをすべて参照すると包含率は両向きとも1になる。終了側はユニークな親の列にする
+        self.create_csv('cust.csv', 'cid,name\n' + ''.join(f'{i},n{i}\n' for i in range(1, 31)))
+        self.create_csv('orders.csv', 'oid,cust_ref\n' + ''.join(f'{i},{i % 30 + 1}\n' for i in range(90)))
+        model.import_csv_dir(os.path.join(self.directory.name, 'csv'), workers=1, profile=True)
+        candidates = model.discover_connections(workers=1)
+        self.assertIn(['orders', 'cust', 'cust_ref', 'cid'], [candidate[:4] for candidate in candidates])
+        self.assertNotIn(['cust', 'orders', 'cid', 'cust_ref'], [candidate[:4] for candidate in candidates])
+
+class ImportSqliteTest(ModelTestCase):
+    def test_edit_columns_after_reimport(self):
+        path = self.create_source('source.db', 'CREATE TABLE child (a TEXT, b TEXT, c TEXT, pid INT);')
+        model.import_sqlite_files([path])
+        self.create_source('source.db', 'ALTER TABLE child DROP COLUMN b;')
+        model.import_sqlite_files([path])
+        self.assertEqual(model.get_table_columns('child'), ['a', 'c', 'pid'])
+
+        # 取り込みで列番号が飛んでいても、追加した列は既存の番号と重ならない
+        model.update_columns('child', ['a', 'c', 'pid', 'newcol'])
+        self.assertEqual(model.get_table_columns('child'), ['a', 'c', 'pid', 'newcol'])
+        rows = model.db.execute('SELECT column_no FROM table_columns WHERE table_no=?', [model.get_table_no('child')]).fetchall()
+        self.assertEqual(len(rows), len(set(rows)))
+        self.assertEqual(model.search_names('newcol'), [('child', 'newcol')])
+
+    def test_reimport_after_rename(self):
+        path = self.create_source('source.db', 'CREATE TABLE p (id INTEGER PRIMARY KEY); CREATE TABLE c (id INT, pid INT REFERENCES p(id));')
+        model.import_sqlite_files([path])
+        model.insert_table('manual', ['cid'])
+        model.insert_connection('c', 'manual', [['id', 'cid']], [None])
+        model.update_table('c', 'c_renamed')
+        model.update_table('p', 'p_renamed')
+
+        # 名前を変えたテーブルも同じ取り込み元のテーブルとして扱い、消して作り直さない
+        counts, skipped, _ = model.import_sqlite_files([path])
+        self.assertEqual(counts['unchanged'], 2)
+        self.assertEqual(counts['deleted'], 0)
+        self.assertEqual(skipped, [])
+        self.assertEqual(sorted(model.get_tables()), ['c_renamed', 'manual', 'p_renamed'])
+        self.assertEqual(model.get_connection_keys('c_renamed', 'manual'), [['id', 'cid', None, None, None]])
+        self.assertEqual(len(model.get_connection_keys('c_renamed', 'p_renamed')), 1)
+
+        self.create_source('source.db', 'ALTER TABLE c ADD COLUMN memo TEXT;')
+        counts, _, _ = model.import_sqlite_files([path])
+        self.assertEqual(counts['changed'], 1)
+        self.assertEqual(model.get_table_columns('c_renamed'), ['id', 'pid', 'memo'])
+
+    def test_virtual_tables_are_skipped(self):
+        script = 'CREATE TABLE doc (id INTEGER PRIMARY KEY, body TEXT); CREATE VIRTUAL TABLE f USING fts5(body); CREATE VIRTUAL TABLE r USING rtree(id, x1, x2);'
+        path = self.create_source('source.db', script)
+        counts, skipped, _ = model.import_sqlite_files([path])
+        self.assertEqual(model.get_tables(), ['doc'])
+        self.assertEqual(counts['added'], 1)
+        self.assertEqual(skipped, [])
+
+    def test_virtual_tables_are_skipped_without_table_list(self):
+        # pragma_table_listのない古いSQLiteでの判定
+        version_info = sqlite3.sqlite_version_info
+        sqlite3.sqlite_version_info = (3, 36, 0)
+        try:
+            self.test_virtual_tables_are_skipped()
+        finally:
+            sqlite3.sqlite_version_info = version_info
+
+class ForceLayoutTest(unittest.TestCase):
+    def test_iterations_are_capped_by_node_count(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest('numpy is not installed')
+        sizes = [(100, 60)] * 50
+        edges = [(i, i - 1) for i in range(1, 50)]
+        # 途中経過は10回ごと、最後に重なりを取り除いた結果を1回返す
+        self.assertEqual(len(list(model.force_layout(sizes, edges))), 11)
+        work_limit = model.layout_work_limit
+        model.layout_work_limit = 50 * 30
+        try:
+            points = list(model.force_layout(sizes, edges))
+        finally:
+            model.layout_work_limit = work_limit
+        self.assertEqual(len(points), 4)
+        self.assertEqual(points[-1].shape, (50, 2))
+
+class ExportDdlTest(ModelTestCase):
+    def test_round_trip_through_sqlite(self):
+        script = '''
+        CREATE TABLE "order items" (id INTEGER PRIMARY KEY, "say ""hi""" TEXT, order_no INT, line_no INT, FOREIGN KEY (order_no, line_no) REFERENCES orders (no, line));
+        CREATE TABLE orders (no INT, line INT, code TEXT UNIQUE, cust_id INT REFERENCES 顧客 (id));
+        CREATE TABLE 顧客 (id INTEGER PRIMARY KEY, 名前 TEXT);
+        '''
+        model.import_sqlite_files([self.create_source('source.db', script)])
+        tables = {table: model.get_table_column_details(table) for table in model.get_tables()}
+        connections = model.get_connection()
+
+        out = io.StringIO()
+        model.export_ddl(out)
+        path = self.create_source('exported.db', out.getvalue())
+
+        # 書き出したDDLを別のtable.dbに取り込み直すと同じ内容になる
+        model.db.close()
+        model.db.path = os.path.join(self.directory.name, 'table2.db')
+        model.catalog.invalidate()
+        model.init_table()
+        counts, skipped, _ = model.import_sqlite_files([path])
+        self.assertEqual(skipped, [])
+        self.assertEqual(counts['added'], 3)
+        self.assertEqual({table: model.get_table_column_details(table) for table in model.get_tables()}, tables)
+        self.assertEqual(model.get_connection(), connections)
+
+if __name__ == '__main__':
+    unittest.main()